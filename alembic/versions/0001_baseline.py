@@ -0,0 +1,69 @@
+"""Baseline schema, as created by init_db() before migrations existed
+
+Databases created by the app's create_all() before migrations existed already
+have these tables; the upgrade detects that and only records the revision.
+
+Revision ID: 0001_baseline
+Revises:
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision = "0001_baseline"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    if sa.inspect(op.get_bind()).has_table("users"):
+        return
+    
+    op.create_table(
+        "users",
+        sa.Column("id", sa.String(), primary_key=True),
+        sa.Column("email", sa.String(), nullable=False, unique=True),
+        sa.Column("currency", sa.String(), nullable=True),
+        sa.Column("dark_mode", sa.Boolean(), nullable=False),
+        sa.Column("budget", sa.Float(), nullable=True),
+        sa.Column("savings_balance", sa.Float(), nullable=False),
+        sa.Column("ai_insights_enabled", sa.Boolean(), nullable=False),
+        sa.Column("is_currency_set", sa.Boolean(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+    )
+    
+    op.create_table(
+        "transactions",
+        sa.Column("id", postgresql.UUID(as_uuid=True), primary_key=True),
+        sa.Column("user_id", sa.String(), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("amount", sa.Float(), nullable=False),
+        sa.Column("currency", sa.String(), nullable=False),
+        sa.Column("category", sa.String(), nullable=False),
+        sa.Column("remarks", sa.String(), nullable=True),
+        sa.Column("date", sa.String(), nullable=False),
+        sa.Column("type", sa.String(), nullable=False),
+        sa.Column("source", sa.String(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+    )
+    op.create_index("ix_transactions_user_id", "transactions", ["user_id"])
+    
+    op.create_table(
+        "monthly_summaries",
+        sa.Column("id", postgresql.UUID(as_uuid=True), primary_key=True),
+        sa.Column("user_id", sa.String(), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("month", sa.Integer(), nullable=False),
+        sa.Column("year", sa.Integer(), nullable=False),
+        sa.Column("ai_insights", sa.Text(), nullable=False),
+        sa.Column("last_generated", sa.DateTime(), nullable=False),
+    )
+    op.create_index("ix_monthly_summaries_user_id", "monthly_summaries", ["user_id"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_monthly_summaries_user_id", table_name="monthly_summaries")
+    op.drop_table("monthly_summaries")
+    op.drop_index("ix_transactions_user_id", table_name="transactions")
+    op.drop_table("transactions")
+    op.drop_table("users")
@@ -0,0 +1,45 @@
+"""Store transactions.date as DATE and index (user_id, date)
+
+Revision ID: 0002_transaction_date_type
+Revises: 0001_baseline
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0002_transaction_date_type"
+down_revision = "0001_baseline"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.alter_column(
+        "transactions",
+        "date",
+        type_=sa.Date(),
+        existing_nullable=False,
+        postgresql_using="date::date",
+    )
+    op.create_index(
+        "ix_transactions_user_date_created",
+        "transactions",
+        ["user_id", sa.text("date DESC"), sa.text("created_at DESC")],
+    )
+    op.create_index(
+        "ix_transactions_user_type_date",
+        "transactions",
+        ["user_id", "type", "date"],
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_transactions_user_type_date", table_name="transactions")
+    op.drop_index("ix_transactions_user_date_created", table_name="transactions")
+    op.alter_column(
+        "transactions",
+        "date",
+        type_=sa.String(),
+        existing_nullable=False,
+        postgresql_using="to_char(date, 'YYYY-MM-DD')",
+    )
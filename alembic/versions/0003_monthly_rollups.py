@@ -0,0 +1,49 @@
+"""Add monthly_rollups and backfill it from transactions
+
+Revision ID: 0003_monthly_rollups
+Revises: 0002_transaction_date_type
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0003_monthly_rollups"
+down_revision = "0002_transaction_date_type"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "monthly_rollups",
+        sa.Column("user_id", sa.String(), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("year", sa.Integer(), nullable=False),
+        sa.Column("month", sa.Integer(), nullable=False),
+        sa.Column("type", sa.String(), nullable=False),
+        sa.Column("category", sa.String(), nullable=False),
+        sa.Column("source", sa.String(), nullable=False),
+        sa.Column("currency", sa.String(), nullable=False),
+        sa.Column("total", sa.Float(), nullable=False),
+        sa.Column("count", sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint("user_id", "year", "month", "type", "category", "source", "currency"),
+    )
+    op.execute(
+        """
+        INSERT INTO monthly_rollups (user_id, year, month, type, category, source, currency, total, count)
+        SELECT user_id,
+               EXTRACT(YEAR FROM date)::int,
+               EXTRACT(MONTH FROM date)::int,
+               type,
+               category,
+               COALESCE(source, ''),
+               currency,
+               SUM(amount),
+               COUNT(*)
+        FROM transactions
+        GROUP BY 1, 2, 3, 4, 5, 6, 7
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("monthly_rollups")
@@ -0,0 +1,37 @@
+"""Add category_cache and category_overrides
+
+Revision ID: 0004_category_cache
+Revises: 0003_monthly_rollups
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0004_category_cache"
+down_revision = "0003_monthly_rollups"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "category_cache",
+        sa.Column("remarks_key", sa.String(), nullable=False),
+        sa.Column("amount_bucket", sa.Integer(), nullable=False),
+        sa.Column("category", sa.String(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint("remarks_key", "amount_bucket"),
+    )
+    op.create_table(
+        "category_overrides",
+        sa.Column("user_id", sa.String(), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("remarks_key", sa.String(), nullable=False),
+        sa.Column("category", sa.String(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint("user_id", "remarks_key"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("category_overrides")
+    op.drop_table("category_cache")
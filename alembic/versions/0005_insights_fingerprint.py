@@ -0,0 +1,27 @@
+"""Add transactions.updated_at and monthly_summaries.fingerprint
+
+Revision ID: 0005_insights_fingerprint
+Revises: 0004_category_cache
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0005_insights_fingerprint"
+down_revision = "0004_category_cache"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("transactions", sa.Column("updated_at", sa.DateTime(), nullable=True))
+    op.execute("UPDATE transactions SET updated_at = created_at")
+    op.alter_column("transactions", "updated_at", nullable=False)
+    
+    # Existing summaries have no fingerprint, so they are treated as stale and refreshed on next read
+    op.add_column("monthly_summaries", sa.Column("fingerprint", sa.String(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("monthly_summaries", "fingerprint")
+    op.drop_column("transactions", "updated_at")
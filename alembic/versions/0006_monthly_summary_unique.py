@@ -0,0 +1,36 @@
+"""Unique (user_id, year, month) on monthly_summaries
+
+Revision ID: 0006_monthly_summary_unique
+Revises: 0005_insights_fingerprint
+Create Date: 2026-10-17
+"""
+from alembic import op
+
+revision = "0006_monthly_summary_unique"
+down_revision = "0005_insights_fingerprint"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Concurrent generations could store duplicates; keep the most recent per month
+    op.execute(
+        """
+        DELETE FROM monthly_summaries a
+        USING monthly_summaries b
+        WHERE a.user_id = b.user_id
+          AND a.year = b.year
+          AND a.month = b.month
+          AND (a.last_generated, a.id) < (b.last_generated, b.id)
+        """
+    )
+    op.create_index(
+        "uq_monthly_summaries_user_year_month",
+        "monthly_summaries",
+        ["user_id", "year", "month"],
+        unique=True,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("uq_monthly_summaries_user_year_month", table_name="monthly_summaries")
@@ -0,0 +1,30 @@
+"""Add fx_rates daily snapshots
+
+Revision ID: 0007_fx_rates
+Revises: 0006_monthly_summary_unique
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision = "0007_fx_rates"
+down_revision = "0006_monthly_summary_unique"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # The (base, date) primary key doubles as the as-of lookup index
+    op.create_table(
+        "fx_rates",
+        sa.Column("base", sa.String(3), nullable=False),
+        sa.Column("date", sa.Date(), nullable=False),
+        sa.Column("rates", postgresql.JSONB(), nullable=False),
+        sa.Column("fetched_at", sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint("base", "date"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("fx_rates")
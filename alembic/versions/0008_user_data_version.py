@@ -0,0 +1,24 @@
+"""Add users.data_version
+
+Revision ID: 0008_user_data_version
+Revises: 0007_fx_rates
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0008_user_data_version"
+down_revision = "0007_fx_rates"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "users",
+        sa.Column("data_version", sa.BigInteger(), server_default="0", nullable=False),
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("users", "data_version")
@@ -0,0 +1,37 @@
+"""Index every keyset sort on transactions, including the id tie-breaker
+
+Revision ID: 0009_transaction_keyset_indexes
+Revises: 0008_user_data_version
+Create Date: 2026-10-17
+"""
+from alembic import op
+
+revision = "0009_transaction_keyset_indexes"
+down_revision = "0008_user_data_version"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # All-ascending so the (lead, created_at, id) row comparison is an index condition;
+    # descending sorts scan the same index backwards
+    op.create_index(
+        "ix_transactions_user_date_created_id",
+        "transactions",
+        ["user_id", "date", "created_at", "id"],
+    )
+    op.create_index(
+        "ix_transactions_user_amount_created_id",
+        "transactions",
+        ["user_id", "amount", "created_at", "id"],
+    )
+    op.drop_index("ix_transactions_user_date_created", table_name="transactions")
+
+
+def downgrade() -> None:
+    op.execute(
+        "CREATE INDEX ix_transactions_user_date_created "
+        "ON transactions (user_id, date DESC, created_at DESC)"
+    )
+    op.drop_index("ix_transactions_user_amount_created_id", table_name="transactions")
+    op.drop_index("ix_transactions_user_date_created_id", table_name="transactions")
@@ -0,0 +1,22 @@
+"""Add monthly_summaries.rates_date
+
+Revision ID: 0010_monthly_summary_rates_date
+Revises: 0009_transaction_keyset_indexes
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0010_monthly_summary_rates_date"
+down_revision = "0009_transaction_keyset_indexes"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Existing fingerprints don't cover the FX snapshot, so those summaries refresh on next read
+    op.add_column("monthly_summaries", sa.Column("rates_date", sa.String(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("monthly_summaries", "rates_date")
@@ -0,0 +1,132 @@
+# In-process caches shared across requests
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+
+class TTLCache:
+    """Bounded, thread-safe LRU cache with per-entry expiry."""
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 300.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data: "OrderedDict[Hashable, tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+
+            expires_at, value = entry
+            if expires_at <= now:
+                del self._data[key]
+                self.misses += 1
+                return default
+
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        """Store a value. `ttl` can only shorten the cache-wide TTL, never extend it."""
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        if ttl <= 0 or self.maxsize <= 0:
+            return
+
+        with self._lock:
+            self._data[key] = (time.monotonic() + ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key: Hashable) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+        }
+
+
+class FlightAbandoned(Exception):
+    """Set on a lead() future whose owner stopped before producing a result."""
+
+
+class SingleFlight:
+    """Concurrent calls with the same key share one in-flight coroutine and its result."""
+
+    def __init__(self):
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+        self.calls = 0
+        self.shared = 0
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._inflight
+
+    def _track(self, key: Hashable, future: asyncio.Future) -> None:
+        def forget(done: asyncio.Future) -> None:
+            # Only our own entry - an abandoned flight may already have a successor
+            if self._inflight.get(key) is done:
+                del self._inflight[key]
+
+        self._inflight[key] = future
+        future.add_done_callback(forget)
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        while True:
+            task = self._inflight.get(key)
+            if task is None:
+                self.calls += 1
+                task = asyncio.ensure_future(fn())
+                self._track(key, task)
+            else:
+                self.shared += 1
+
+            try:
+                # A caller that goes away (client disconnect) must not cancel the others' work
+                return await asyncio.shield(task)
+            except FlightAbandoned:
+                continue  # the leader gave up without a result: run (or join) a fresh flight
+
+    def lead(self, key: Hashable) -> Optional[asyncio.Future]:
+        """Claim `key` for work the caller drives itself (e.g. a stream); None if already in flight.
+        
+        The caller must resolve the returned future; do() callers meanwhile wait on it.
+        """
+        if key in self._inflight:
+            return None
+        self.calls += 1
+        future = asyncio.get_running_loop().create_future()
+        self._track(key, future)
+        return future
+
+    @staticmethod
+    def abandon(future: asyncio.Future) -> None:
+        """Give up a lead() claim without a result; waiting do() callers run their own call."""
+        if not future.done():
+            future.set_exception(FlightAbandoned())
+            future.exception()  # mark retrieved - there may be nobody waiting
+
+    def stats(self) -> dict:
+        return {"in_flight": len(self._inflight), "calls": self.calls, "shared": self.shared}
@@ -1,40 +1,97 @@
 # Postgres connection via SQLAlchemy async
+import logging
+import threading
+import time
+from pathlib import Path
+
+from sqlalchemy import text
+from sqlalchemy.exc import ProgrammingError
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
 from sqlalchemy.orm import DeclarativeBase
-from sqlalchemy.pool import NullPool
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool
 from typing import AsyncGenerator
 
 from .config import get_settings
 
+logger = logging.getLogger(__name__)
+
 
 class Base(DeclarativeBase):
     pass
 
 
+class TimedQueuePool(AsyncAdaptedQueuePool):
+    """Queue pool that records how long checkouts wait for a connection."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._stats_lock = threading.Lock()
+        self.checkouts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            waited = time.perf_counter() - start
+            with self._stats_lock:
+                self.checkouts += 1
+                self.total_wait += waited
+                self.max_wait = max(self.max_wait, waited)
+
+
 _engine = None
 _session_factory = None
 
 
+def _pool_options(settings) -> dict:
+    if settings.db_pool_mode == "null":
+        # pgbouncer handles connection pooling
+        # psycopg doesn't use prepared statements by default, so pgbouncer works!
+        return {"poolclass": NullPool}
+    
+    if settings.db_pool_mode == "queue":
+        return {
+            "poolclass": TimedQueuePool,
+            "pool_size": settings.db_pool_size,
+            "max_overflow": settings.db_max_overflow,
+            "pool_pre_ping": settings.db_pool_pre_ping,
+            "pool_recycle": settings.db_pool_recycle,
+            "pool_timeout": settings.db_pool_timeout,
+        }
+    
+    raise ValueError(f"Unknown DB_POOL_MODE '{settings.db_pool_mode}' (expected 'null' or 'queue')")
+
+
+def get_database_url() -> str:
+    """DATABASE_URL rewritten for the psycopg driver."""
+    db_url = get_settings().database_url
+    
+    # Convert asyncpg URL to psycopg if needed
+    if "postgresql+asyncpg://" in db_url:
+        db_url = db_url.replace("postgresql+asyncpg://", "postgresql+psycopg://")
+    elif "postgresql://" in db_url and "+psycopg" not in db_url:
+        db_url = db_url.replace("postgresql://", "postgresql+psycopg://")
+    return db_url
+
+
 def get_engine():
     global _engine
     if _engine is None:
         settings = get_settings()
+        db_url = get_database_url()
         
-        # Convert asyncpg URL to psycopg if needed
-        db_url = settings.database_url
-        if "postgresql+asyncpg://" in db_url:
-            db_url = db_url.replace("postgresql+asyncpg://", "postgresql+psycopg://")
-        elif "postgresql://" in db_url and "+psycopg" not in db_url:
-            db_url = db_url.replace("postgresql://", "postgresql+psycopg://")
-        
-        print(f"DEBUG: Connecting to DB: {db_url.split('@')[-1]}")
+        pool_options = _pool_options(settings)
+        logger.info(
+            f"Connecting to DB: {db_url.split('@')[-1]} (pool mode: {settings.db_pool_mode})"
+        )
         
-        # Use NullPool - pgbouncer handles connection pooling
-        # psycopg doesn't use prepared statements by default, so pgbouncer works!
         _engine = create_async_engine(
             db_url,
             echo=settings.debug,
-            poolclass=NullPool,
+            **pool_options,
         )
     return _engine
 
@@ -50,6 +107,29 @@ def session_factory():
     return _session_factory
 
 
+def get_pool_stats() -> dict:
+    """Live connection pool counters for health checks."""
+    settings = get_settings()
+    if _engine is None:
+        return {"mode": settings.db_pool_mode, "initialized": False}
+    
+    pool = _engine.pool
+    if not isinstance(pool, TimedQueuePool):
+        return {"mode": settings.db_pool_mode, "initialized": True}
+    
+    return {
+        "mode": settings.db_pool_mode,
+        "initialized": True,
+        "size": pool.size(),
+        "checked_in": pool.checkedin(),
+        "checked_out": pool.checkedout(),
+        "overflow": pool.overflow(),
+        "checkouts": pool.checkouts,
+        "avg_wait_ms": round(pool.total_wait / pool.checkouts * 1000, 3) if pool.checkouts else 0.0,
+        "max_wait_ms": round(pool.max_wait * 1000, 3),
+    }
+
+
 async def get_db() -> AsyncGenerator[AsyncSession, None]:
     """DB session for FastAPI dependency injection."""
     factory = session_factory()
@@ -62,10 +142,31 @@ async def get_db() -> AsyncGenerator[AsyncSession, None]:
             raise
 
 
+def _head_revision() -> str:
+    from alembic.config import Config
+    from alembic.script import ScriptDirectory
+    
+    root = Path(__file__).resolve().parents[2]
+    config = Config(str(root / "alembic.ini"))
+    config.set_main_option("script_location", str(root / "alembic"))
+    return ScriptDirectory.from_config(config).get_current_head()
+
+
 async def init_db() -> None:
+    """Check the schema is migrated. Alembic owns it: run `alembic upgrade head` before starting."""
     engine = get_engine()
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
+    async with engine.connect() as conn:
+        try:
+            current = (await conn.execute(text("SELECT version_num FROM alembic_version"))).scalar()
+        except ProgrammingError:
+            current = None
+    
+    head = _head_revision()
+    if current != head:
+        raise RuntimeError(
+            f"Database schema is at {current or 'no revision'}, this code needs {head}. "
+            "Run `alembic upgrade head` before starting the app."
+        )
 
 
 async def close_db() -> None:
@@ -0,0 +1,18 @@
+# Calendar helpers for month-scoped queries
+from datetime import date
+from typing import Tuple
+
+# Largest year a month query accepts: month_range() needs the following month to be a valid date
+MAX_YEAR = 9998
+
+
+def shift_month(year: int, month: int, delta: int) -> Tuple[int, int]:
+    """(year, month) moved by `delta` months."""
+    index = year * 12 + (month - 1) + delta
+    return index // 12, index % 12 + 1
+
+
+def month_range(year: int, month: int) -> Tuple[date, date]:
+    """[first day of month, first day of next month) - for indexed range predicates."""
+    next_year, next_month = shift_month(year, month, 1)
+    return date(year, month, 1), date(next_year, next_month, 1)
@@ -0,0 +1,27 @@
+# Conditional GET helpers: weak ETags derived from the per-user data version
+import hashlib
+
+from fastapi import Request, Response
+
+# Bump when a response shape changes so clients don't keep revalidating an old body
+ETAG_SCHEMA = "2"
+
+
+def make_etag(*parts) -> str:
+    """Weak ETag over the endpoint, user, data version and whatever else shapes the body."""
+    digest = hashlib.sha1("|".join(map(str, (ETAG_SCHEMA, *parts))).encode()).hexdigest()
+    return f'W/"{digest[:20]}"'
+
+
+def is_not_modified(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    # Weak comparison, as GET revalidation requires
+    return etag.removeprefix("W/") in {tag.strip().removeprefix("W/") for tag in header.split(",")}
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag})
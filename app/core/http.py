@@ -0,0 +1,80 @@
+# Shared outbound HTTP clients, one pooled keep-alive client per upstream
+import logging
+from typing import Dict, Optional
+
+import httpx
+
+from .config import get_settings
+
+logger = logging.getLogger(__name__)
+
+# Read timeouts per upstream; connect/pool timeouts and limits come from settings
+UPSTREAM_TIMEOUTS = {
+    "fx": 30.0,
+    "jwks": 10.0,
+    "groq": 60.0,  # the AI service enforces its own tighter per-call deadline
+}
+
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+class HTTPClients:
+    """Lazily created clients, reused for the app's lifetime and closed by the lifespan."""
+
+    def __init__(self):
+        settings = get_settings()
+        self.limits = httpx.Limits(
+            max_connections=settings.http_max_connections,
+            max_keepalive_connections=settings.http_max_keepalive_connections,
+            keepalive_expiry=settings.http_keepalive_expiry,
+        )
+        self.connect_timeout = settings.http_connect_timeout
+        self.http2 = settings.http_http2 and _http2_available()
+        if settings.http_http2 and not self.http2:
+            logger.warning("HTTP_HTTP2 is set but the h2 package is missing; using HTTP/1.1")
+        self._clients: Dict[str, httpx.AsyncClient] = {}
+
+    def get(self, upstream: str) -> httpx.AsyncClient:
+        client = self._clients.get(upstream)
+        if client is None or client.is_closed:
+            read_timeout = UPSTREAM_TIMEOUTS.get(upstream, 30.0)
+            client = httpx.AsyncClient(
+                http2=self.http2,
+                limits=self.limits,
+                timeout=httpx.Timeout(read_timeout, connect=self.connect_timeout),
+                headers={"User-Agent": "urWallet/1.0"},
+            )
+            self._clients[upstream] = client
+        return client
+
+    async def aclose(self) -> None:
+        clients, self._clients = self._clients, {}
+        for upstream, client in clients.items():
+            try:
+                await client.aclose()
+            except Exception as e:
+                logger.warning(f"Closing {upstream} HTTP client failed: {e}")
+
+
+_http_clients: Optional[HTTPClients] = None
+
+
+def get_http_client(upstream: str) -> httpx.AsyncClient:
+    """The shared client for `upstream` ("fx", "jwks", "groq")."""
+    global _http_clients
+    if _http_clients is None:
+        _http_clients = HTTPClients()
+    return _http_clients.get(upstream)
+
+
+async def close_http_clients() -> None:
+    global _http_clients
+    if _http_clients is not None:
+        await _http_clients.aclose()
+        _http_clients = None
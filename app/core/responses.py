@@ -0,0 +1,14 @@
+# Fast JSON responses for row-shaped payloads
+import orjson
+from fastapi.responses import JSONResponse
+
+
+class FastJSONResponse(JSONResponse):
+    """Serialized with orjson, straight from plain dicts/lists of row values.
+    
+    Returning one of these skips response_model validation and jsonable_encoder;
+    orjson encodes UUID, date and datetime itself, in the same ISO format.
+    """
+
+    def render(self, content) -> bytes:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
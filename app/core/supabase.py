@@ -1,41 +1,160 @@
 # Supabase JWT verification - supports both HS256 (legacy) and RS256 (new)
+import asyncio
+import hashlib
+import time
 import jwt
-from jwt import PyJWKClient
-from typing import Optional
+from typing import Dict, Optional
 import logging
 
+from .cache import TTLCache
 from .config import get_settings
+from .http import get_http_client
 
 logger = logging.getLogger(__name__)
 
-# Cache for JWKS client
-_jwks_client: Optional[PyJWKClient] = None
+# Verified claims keyed by sha256(token), so raw tokens are never held in memory
+_token_cache: Optional[TTLCache] = None
 
 
-def get_jwks_client() -> Optional[PyJWKClient]:
-    """Get or create JWKS client for Supabase."""
-    global _jwks_client
-    if _jwks_client is None:
+def get_token_cache() -> TTLCache:
+    global _token_cache
+    if _token_cache is None:
         settings = get_settings()
-        if not settings.supabase_url:
-            logger.error("Supabase URL not configured")
-            return None
+        _token_cache = TTLCache(
+            maxsize=settings.token_cache_size,
+            ttl=settings.token_cache_ttl_seconds,
+        )
+    return _token_cache
+
+
+def _token_key(access_token: str) -> str:
+    return hashlib.sha256(access_token.encode("utf-8")).hexdigest()
+
+
+def _cache_verified(key: str, decoded: dict) -> dict:
+    exp = decoded.get("exp")
+    if exp is not None:
+        get_token_cache().set(key, decoded, ttl=float(exp) - time.time())
+    return decoded
+
+
+class JWKSKeyStore:
+    """Supabase signing keys, fetched asynchronously and refreshed off the request path."""
+
+    def __init__(self, jwks_url: str, refresh_interval: float, min_refresh_interval: float):
+        self.jwks_url = jwks_url
+        self.refresh_interval = refresh_interval
+        self.min_refresh_interval = min_refresh_interval
+        self._keys: Dict[str, jwt.PyJWK] = {}
+        self._last_refresh = 0.0
+        self._inflight: Optional[asyncio.Task] = None
+        self._refresher: Optional[asyncio.Task] = None
+
+    async def start(self) -> None:
+        try:
+            await self.refresh()
+            logger.info(f"Loaded {len(self._keys)} JWKS signing keys")
+        except Exception as e:
+            logger.warning(f"Could not load JWKS at startup: {e}")
+        self._refresher = asyncio.create_task(self._refresh_loop())
+
+    async def stop(self) -> None:
+        if self._refresher:
+            self._refresher.cancel()
+            try:
+                await self._refresher
+            except asyncio.CancelledError:
+                pass
+            self._refresher = None
+
+    async def refresh(self) -> None:
+        """Re-fetch the key set. Concurrent callers share a single fetch."""
+        if self._inflight is None or self._inflight.done():
+            self._inflight = asyncio.create_task(self._fetch())
+        await asyncio.shield(self._inflight)
+
+    async def get_signing_key(self, kid: Optional[str]) -> Optional[jwt.PyJWK]:
+        key = self._keys.get(kid)
+        if key is not None:
+            return key
         
-        jwks_url = f"{settings.supabase_url}/auth/v1/.well-known/jwks.json"
+        # Unknown kid usually means a key rotation. Join a fetch already in flight; only
+        # starting a new one is rate-limited, so bogus kids can't force fetches.
+        in_flight = self._inflight is not None and not self._inflight.done()
+        if not in_flight and time.monotonic() - self._last_refresh < self.min_refresh_interval:
+            return None
         try:
-            _jwks_client = PyJWKClient(jwks_url, cache_keys=True)
-            logger.info(f"JWKS client initialized for {settings.supabase_url}")
+            await self.refresh()
         except Exception as e:
-            logger.warning(f"Could not initialize JWKS client: {e}")
+            logger.warning(f"JWKS refresh for unknown kid failed: {e}")
+        return self._keys.get(kid)
+
+    async def _fetch(self) -> None:
+        try:
+            response = await get_http_client("jwks").get(self.jwks_url)
+            response.raise_for_status()
+            
+            jwk_set = jwt.PyJWKSet.from_dict(response.json())
+            self._keys = {k.key_id: k for k in jwk_set.keys if k.key_id}
+        finally:
+            # Stamped on completion (failed fetches count too), so callers during the fetch share it
+            self._last_refresh = time.monotonic()
+
+    async def _refresh_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.refresh_interval)
+            try:
+                await self.refresh()
+            except Exception as e:
+                logger.warning(f"Background JWKS refresh failed: {e}")
+
+
+_jwks_store: Optional[JWKSKeyStore] = None
+
+
+def get_jwks_store() -> Optional[JWKSKeyStore]:
+    """Get or create the JWKS key store for Supabase."""
+    global _jwks_store
+    if _jwks_store is None:
+        settings = get_settings()
+        if not settings.supabase_url:
+            logger.error("Supabase URL not configured")
             return None
-    
-    return _jwks_client
+        
+        _jwks_store = JWKSKeyStore(
+            f"{settings.supabase_url}/auth/v1/.well-known/jwks.json",
+            refresh_interval=settings.jwks_refresh_interval_seconds,
+            min_refresh_interval=settings.jwks_min_refresh_interval_seconds,
+        )
+    return _jwks_store
+
 
+async def start_jwks_store() -> None:
+    # HS256-only deployments have no JWKS endpoint; only an RS256/ES256 token without one is an error
+    if not get_settings().supabase_url:
+        logger.debug("Supabase URL not configured; JWKS store not started")
+        return
+    store = get_jwks_store()
+    if store:
+        await store.start()
 
-def verify_supabase_token(access_token: str) -> Optional[dict]:
+
+async def stop_jwks_store() -> None:
+    global _jwks_store
+    if _jwks_store:
+        await _jwks_store.stop()
+        _jwks_store = None
+
+
+async def verify_supabase_token(access_token: str) -> Optional[dict]:
     """Verify Supabase JWT - tries RS256 (JWKS) first, falls back to HS256."""
     settings = get_settings()
     
+    key = _token_key(access_token)
+    cached = get_token_cache().get(key)
+    if cached is not None:
+        return cached
+    
     # First, decode without verification to check the algorithm
     try:
         unverified = jwt.decode(access_token, options={"verify_signature": False})
@@ -47,17 +166,20 @@ def verify_supabase_token(access_token: str) -> Optional[dict]:
     
     # Try RS256 or ES256 with JWKS
     if alg in ("RS256", "ES256"):
-        jwks_client = get_jwks_client()
-        if jwks_client:
+        jwks_store = get_jwks_store()
+        if jwks_store:
             try:
-                signing_key = jwks_client.get_signing_key_from_jwt(access_token)
+                signing_key = await jwks_store.get_signing_key(header.get("kid"))
+                if signing_key is None:
+                    logger.warning(f"No JWKS signing key for kid {header.get('kid')}")
+                    return None
                 decoded = jwt.decode(
                     access_token,
                     signing_key.key,
                     algorithms=["RS256", "ES256"],
                     audience="authenticated",
                 )
-                return decoded
+                return _cache_verified(key, decoded)
             except Exception as e:
                 logger.warning(f"{alg} verification failed: {e}")
                 return None
@@ -75,7 +197,7 @@ def verify_supabase_token(access_token: str) -> Optional[dict]:
                 algorithms=["HS256"],
                 audience="authenticated",
             )
-            return decoded
+            return _cache_verified(key, decoded)
         except jwt.ExpiredSignatureError:
             logger.warning("Supabase token expired")
             return None
@@ -2,23 +2,126 @@
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
-from typing import Tuple
+from sqlalchemy import event, select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+from typing import Optional, Tuple
 
+from .core.cache import TTLCache
+from .core.config import get_settings
 from .core.database import get_db
 from .core.supabase import verify_supabase_token, get_user_id_from_token, get_email_from_token
 from .models.user import User
 
 security = HTTPBearer()
 
+# Detached User rows by id. Writers go through lock_user(), which evicts the entry.
+_user_cache: Optional[TTLCache] = None
+
+
+def get_user_cache() -> TTLCache:
+    global _user_cache
+    if _user_cache is None:
+        settings = get_settings()
+        _user_cache = TTLCache(
+            maxsize=settings.user_cache_size,
+            ttl=settings.user_cache_ttl_seconds,
+        )
+    return _user_cache
+
+
+def invalidate_cached_user(user_id: str) -> None:
+    get_user_cache().pop(user_id)
+
+
+@event.listens_for(Session, "after_commit")
+def _sync_user_cache(session: Session) -> None:
+    # Rows inserted on first login are cached only once they exist for other requests,
+    # unless this same transaction also wrote them
+    written = session.info.pop("written_users", set())
+    cache = get_user_cache()
+    for user_id, user in session.info.pop("new_users", {}).items():
+        if user_id not in written:
+            cache.set(user_id, user)
+    # Evict again once the write is visible, so a read that raced the commit can't keep a stale row
+    for user_id in written:
+        invalidate_cached_user(user_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def _drop_new_users(session: Session) -> None:
+    session.info.pop("new_users", None)
+
+
+def _cache_user(db: AsyncSession, user_id: str, user: User) -> None:
+    if user_id in db.info.get("new_users", ()):
+        db.info["new_users"][user_id] = user
+    else:
+        get_user_cache().set(user_id, user)
+
+
+async def lock_user(db: AsyncSession, user_id: str) -> User:
+    """Load the user row for writing (SELECT ... FOR UPDATE) and evict it from the cache."""
+    result = await db.execute(
+        select(User).where(User.id == user_id).with_for_update()
+    )
+    user = result.scalar_one()
+    invalidate_cached_user(user_id)
+    db.info.setdefault("written_users", set()).add(user_id)
+    return user
+
+
+async def bump_data_version(db: AsyncSession, user_id: str) -> None:
+    """Mark the user's data as changed - every transaction and settings write calls this."""
+    await db.execute(
+        update(User).where(User.id == user_id).values(data_version=User.data_version + 1)
+    )
+    invalidate_cached_user(user_id)
+    db.info.setdefault("written_users", set()).add(user_id)
+
+
+async def _load_user(db: AsyncSession, user_id: str, email: Optional[str]) -> User:
+    result = await db.execute(select(User).where(User.id == user_id))
+    user = result.scalar_one_or_none()
+    
+    if user is None:
+        # First login - concurrent requests from a new user all land here
+        stmt = (
+            insert(User)
+            .values(id=user_id, email=email or "")
+            .on_conflict_do_nothing()
+            .returning(User)
+        )
+        user = (await db.scalars(stmt)).one_or_none()
+        if user is not None:
+            # Not cached until the request commits - a rollback would leave a phantom user
+            db.info.setdefault("new_users", {})[user_id] = user
+    
+    if user is None:
+        # Lost the insert race; the winner's row is committed by now
+        result = await db.execute(select(User).where(User.id == user_id))
+        user = result.scalar_one_or_none()
+    
+    if user is None:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Email is already registered to another account",
+        )
+    
+    db.expunge(user)
+    return user
+
 
 async def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
     db: AsyncSession = Depends(get_db),
 ) -> Tuple[str, User]:
-    """Verify Supabase token, return (uid, user). Creates user on first login."""
+    """Verify Supabase token, return (uid, user). Creates user on first login.
+    
+    The user is a cached, detached row - use lock_user() before modifying it.
+    """
     token = credentials.credentials
-    decoded = verify_supabase_token(token)
+    decoded = await verify_supabase_token(token)
     
     if not decoded:
         raise HTTPException(
@@ -36,23 +139,40 @@ async def get_current_user(
             detail="Invalid token: missing user id",
         )
     
-    result = await db.execute(select(User).where(User.id == user_id))
-    user = result.scalar_one_or_none()
-    
+    cache = get_user_cache()
+    user = cache.get(user_id)
     if user is None:
-        user = User(id=user_id, email=email or "")
-        db.add(user)
-        await db.flush()
+        user = await _load_user(db, user_id, email)
+        _cache_user(db, user_id, user)
     
     return user_id, user
 
 
+async def get_versioned_user(
+    user_data: Tuple[str, User] = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+) -> Tuple[str, User, int]:
+    """(uid, user, data_version), with the version read fresh by primary key.
+    
+    A cached user older than that version (written through another worker) is reloaded.
+    """
+    user_id, user = user_data
+    result = await db.execute(select(User.data_version).where(User.id == user_id))
+    version = result.scalar_one()
+    
+    if user.data_version != version:
+        user = await _load_user(db, user_id, user.email)
+        _cache_user(db, user_id, user)
+    
+    return user_id, user, version
+
+
 async def get_current_user_id(
     credentials: HTTPAuthorizationCredentials = Depends(security),
 ) -> str:
     """Just get user_id without DB lookup."""
     token = credentials.credentials
-    decoded = verify_supabase_token(token)
+    decoded = await verify_supabase_token(token)
     
     if not decoded:
         raise HTTPException(
@@ -6,7 +6,14 @@ from fastapi import FastAPI
 from starlette.middleware.cors import CORSMiddleware
 
 from .core.config import get_settings
-from .core.database import init_db, close_db
+from .core.database import init_db, close_db, get_pool_stats
+from .core.http import close_http_clients
+from .core.supabase import start_jwks_store, stop_jwks_store, get_token_cache
+from .dependencies import get_user_cache
+from .services.ai import get_ai_service
+from .services.currency import get_rate_cache
+from .services.categorizer import get_categorizer
+from .services.classifier import get_classifier
 from .routers import auth, user, transactions, dashboard, ai, currency
 
 logging.basicConfig(
@@ -20,11 +27,16 @@ logger = logging.getLogger(__name__)
 async def lifespan(app: FastAPI):
     logger.info("Starting urWallet API...")
     await init_db()
-    logger.info("DB initialized")
+    logger.info("DB schema is up to date")
+    await start_jwks_store()
+    get_classifier().start()
     
     yield
     
     logger.info("Shutting down...")
+    await get_classifier().stop()
+    await stop_jwks_store()
+    await close_http_clients()
     await close_db()
 
 
@@ -44,6 +56,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag"],
 )
 
 # Include routers with /api prefix
@@ -58,3 +71,19 @@ app.include_router(currency.router, prefix="/api")
 @app.get("/api/")
 async def root():
     return {"message": "urWallet API", "status": "healthy"}
+
+
+@app.get("/api/health")
+async def health():
+    """Connection pool and in-process cache counters."""
+    return {
+        "status": "healthy",
+        "db_pool": get_pool_stats(),
+        "ai": get_ai_service().stats(),
+        "caches": {
+            "tokens": get_token_cache().stats(),
+            "users": get_user_cache().stats(),
+            "categories": get_categorizer().stats(),
+            "fx_rates": get_rate_cache().stats(),
+        },
+    }
@@ -1,5 +1,15 @@
 # SQLAlchemy Models
 from .user import User
-from .transaction import Transaction, MonthlySummary
+from .transaction import Transaction, MonthlySummary, MonthlyRollup
+from .category import CategoryCache, CategoryOverride
+from .currency import FxRate
 
-__all__ = ["User", "Transaction", "MonthlySummary"]
+__all__ = [
+    "User",
+    "Transaction",
+    "MonthlySummary",
+    "MonthlyRollup",
+    "CategoryCache",
+    "CategoryOverride",
+    "FxRate",
+]
@@ -0,0 +1,25 @@
+# Categorization cache models
+from datetime import datetime
+from sqlalchemy import Column, String, Integer, DateTime, ForeignKey
+
+from ..core.database import Base
+
+
+class CategoryCache(Base):
+    """Global category learned for a normalized remark in an amount bucket."""
+    __tablename__ = "category_cache"
+    
+    remarks_key = Column(String, primary_key=True)
+    amount_bucket = Column(Integer, primary_key=True)
+    category = Column(String, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+
+class CategoryOverride(Base):
+    """Category a user chose themselves for a normalized remark; beats the global cache."""
+    __tablename__ = "category_overrides"
+    
+    user_id = Column(String, ForeignKey("users.id"), primary_key=True)
+    remarks_key = Column(String, primary_key=True)
+    category = Column(String, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, nullable=False)
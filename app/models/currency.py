@@ -0,0 +1,16 @@
+# FX rate snapshot models
+from datetime import datetime
+from sqlalchemy import Column, String, Date, DateTime
+from sqlalchemy.dialects.postgresql import JSONB
+
+from ..core.database import Base
+
+
+class FxRate(Base):
+    """A provider rate table for one base currency, one row per day."""
+    __tablename__ = "fx_rates"
+    
+    base = Column(String(3), primary_key=True)
+    date = Column(Date, primary_key=True)
+    rates = Column(JSONB, nullable=False)  # {"EUR": 0.92, ...} per 1 unit of base
+    fetched_at = Column(DateTime, default=datetime.utcnow, nullable=False)
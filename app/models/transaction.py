@@ -1,7 +1,7 @@
 # Transaction models
 from datetime import datetime
 import uuid
-from sqlalchemy import Column, String, Float, DateTime, Integer, ForeignKey, Text
+from sqlalchemy import Column, String, Float, Date, DateTime, Integer, ForeignKey, Text, Index
 from sqlalchemy.dialects.postgresql import UUID
 
 from ..core.database import Base
@@ -16,10 +16,18 @@ class Transaction(Base):
     currency = Column(String, nullable=False, default="USD")
     category = Column(String, nullable=False)
     remarks = Column(String, nullable=True)
-    date = Column(String, nullable=False)  # YYYY-MM-DD
+    date = Column(Date, nullable=False)
     type = Column(String, nullable=False, default="expense")  # income | expense
     source = Column(String, nullable=True)  # budget | savings (for expenses only)
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+    
+    __table_args__ = (
+        # Month range scans and keyset pages for every sort (scanned backwards for descending)
+        Index("ix_transactions_user_date_created_id", user_id, date, created_at, id),
+        Index("ix_transactions_user_amount_created_id", user_id, amount, created_at, id),
+        Index("ix_transactions_user_type_date", user_id, type, date),
+    )
     
     def to_dict(self) -> dict:
         return {
@@ -29,13 +37,19 @@ class Transaction(Base):
             "currency": self.currency,
             "category": self.category,
             "remarks": self.remarks,
-            "date": self.date,
+            "date": self.date.isoformat() if self.date else None,
             "type": self.type,
             "source": self.source,
             "created_at": self.created_at.isoformat() if self.created_at else None,
         }
 
 
+# TransactionResponse fields, in order - for selecting response rows without loading entities
+TRANSACTION_FIELDS = (
+    "id", "user_id", "amount", "currency", "category", "remarks", "date", "type", "source", "created_at",
+)
+
+
 class MonthlySummary(Base):
     __tablename__ = "monthly_summaries"
     
@@ -44,8 +58,14 @@ class MonthlySummary(Base):
     month = Column(Integer, nullable=False)
     year = Column(Integer, nullable=False)
     ai_insights = Column(Text, nullable=False)
+    fingerprint = Column(String, nullable=True)  # of the month's transactions when generated
+    rates_date = Column(String, nullable=True)  # FX snapshot the totals were converted at
     last_generated = Column(DateTime, default=datetime.utcnow, nullable=False)
     
+    __table_args__ = (
+        Index("uq_monthly_summaries_user_year_month", user_id, year, month, unique=True),
+    )
+    
     def to_dict(self) -> dict:
         return {
             "id": str(self.id),
@@ -53,5 +73,22 @@ class MonthlySummary(Base):
             "month": self.month,
             "year": self.year,
             "ai_insights": self.ai_insights,
+            "fingerprint": self.fingerprint,
+            "rates_date": self.rates_date,
             "last_generated": self.last_generated.isoformat() if self.last_generated else None,
         }
+
+
+class MonthlyRollup(Base):
+    """Running per-month totals, maintained by the transaction write handlers."""
+    __tablename__ = "monthly_rollups"
+    
+    user_id = Column(String, ForeignKey("users.id"), primary_key=True)
+    year = Column(Integer, primary_key=True)
+    month = Column(Integer, primary_key=True)
+    type = Column(String, primary_key=True)
+    category = Column(String, primary_key=True)
+    source = Column(String, primary_key=True, default="")  # "" when the transaction has no source
+    currency = Column(String, primary_key=True)
+    total = Column(Float, default=0.0, nullable=False)
+    count = Column(Integer, default=0, nullable=False)
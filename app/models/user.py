@@ -1,6 +1,6 @@
 # User model
 from datetime import datetime
-from sqlalchemy import Column, String, Boolean, Float, DateTime
+from sqlalchemy import Column, String, Boolean, Float, DateTime, BigInteger
 
 from ..core.database import Base
 
@@ -17,6 +17,8 @@ class User(Base):
     ai_insights_enabled = Column(Boolean, default=True, nullable=False)
     is_currency_set = Column(Boolean, default=False, nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    # Bumped by every transaction and settings write; read endpoints derive ETags from it
+    data_version = Column(BigInteger, default=0, server_default="0", nullable=False)
     
     def to_dict(self) -> dict:
         return {
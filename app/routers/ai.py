@@ -1,23 +1,37 @@
 # AI-powered features routes
+import json
+import logging
+from contextlib import aclosing
 from datetime import datetime, timezone
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, BackgroundTasks, Depends, Query, Request
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
 
 from ..core.database import get_db
-from ..models.transaction import Transaction, MonthlySummary
+from ..core.dates import MAX_YEAR
 from ..schemas.transaction import CategorizeRequest
 from ..dependencies import get_current_user
-from ..services.ai import get_ai_service
+from ..services.ai import INSIGHTS_UNAVAILABLE
+from ..services.categorizer import get_categorizer
+from ..services.spikes import detect_spikes
+from ..services.insights import (
+    month_fingerprint,
+    get_summary,
+    generate_insights,
+    refresh_insights,
+    stream_insights,
+)
 
+logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/ai", tags=["ai"])
 
 
 @router.get("/insights")
 async def get_insights(
-    month: int,
-    year: int,
+    background_tasks: BackgroundTasks,
+    month: int = Query(..., ge=1, le=12),
+    year: int = Query(..., ge=1, le=MAX_YEAR),
     user_data: tuple = Depends(get_current_user),
     db: AsyncSession = Depends(get_db),
 ):
@@ -26,61 +40,110 @@ async def get_insights(
     if not user.ai_insights_enabled:
         return {"insights": "AI insights are disabled in settings."}
     
-    # Check cache first
-    result = await db.execute(
-        select(MonthlySummary)
-        .where(
-            MonthlySummary.user_id == firebase_uid,
-            MonthlySummary.month == month,
-            MonthlySummary.year == year,
-        )
+    currency = user.currency or "USD"
+    fingerprint, rates_date = await month_fingerprint(
+        db, firebase_uid, year, month, user.budget, currency
     )
-    cached = result.scalar_one_or_none()
+    if fingerprint is None:
+        return {"insights": "No transactions for this month yet."}
     
-    if cached:
-        return {"insights": cached.ai_insights}
+    # Check cache first
+    cached = await get_summary(db, firebase_uid, year, month)
     
-    txn_result = await db.execute(
-        select(Transaction).where(Transaction.user_id == firebase_uid)
+    # rates_date: the FX snapshot the insights' totals were converted at (None if no conversion)
+    if cached:
+        stale = cached.fingerprint != fingerprint
+        if stale:
+            # Serve what we have; regenerate after the response is sent. Background tasks
+            # run before get_db's teardown, so end this transaction first - the refresh
+            # opens its own sessions.
+            await db.commit()
+            background_tasks.add_task(
+                refresh_insights, firebase_uid, year, month, user.budget, currency, fingerprint
+            )
+        return {"insights": cached.ai_insights, "stale": stale, "rates_date": cached.rates_date}
+    
+    insights = await generate_insights(
+        firebase_uid, year, month, user.budget, currency, fingerprint
     )
-    all_txns = txn_result.scalars().all()
-    
-    month_str = f"{year}-{month:02d}"
-    month_txns = [t for t in all_txns if t.date.startswith(month_str)]
-    
-    if not month_txns:
-        return {"insights": "No transactions for this month yet."}
+    return {"insights": insights, "stale": False, "rates_date": rates_date}
+
+
+def _sse(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+@router.get("/insights/stream")
+async def stream_insights_sse(
+    request: Request,
+    month: int = Query(..., ge=1, le=12),
+    year: int = Query(..., ge=1, le=MAX_YEAR),
+    user_data: tuple = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    """Server-sent events: `token` events as the LLM writes, then `done` with the full text
+    and the FX snapshot date it was converted at.
     
-    ai_service = get_ai_service()
-    insights = await ai_service.generate_monthly_insights(
-        user_id=firebase_uid,
-        month=month,
-        year=year,
-        transactions=[t.to_dict() for t in month_txns],
-        budget=user.budget,
-        currency=user.currency or "USD",
-    )
+    Fresh cached insights (and the disabled / empty-month messages) arrive as a single `done`.
+    """
+    firebase_uid, user = user_data
+    currency = user.currency or "USD"
     
-    # Cache it
-    summary = MonthlySummary(
-        user_id=firebase_uid,
-        month=month,
-        year=year,
-        ai_insights=insights,
+    text = None
+    fingerprint = rates_date = None
+    if not user.ai_insights_enabled:
+        text = "AI insights are disabled in settings."
+    else:
+        fingerprint, rates_date = await month_fingerprint(
+            db, firebase_uid, year, month, user.budget, currency
+        )
+        if fingerprint is None:
+            text = "No transactions for this month yet."
+        else:
+            cached = await get_summary(db, firebase_uid, year, month)
+            if cached and cached.fingerprint == fingerprint:
+                text = cached.ai_insights
+    
+    # Release the request's connection now: get_db's teardown only runs once the stream
+    # ends, and the generator below opens its own short-lived sessions.
+    await db.commit()
+    
+    async def events():
+        if text is not None:
+            yield _sse("done", {"insights": text, "rates_date": rates_date})
+            return
+        
+        parts = []
+        stream = stream_insights(firebase_uid, year, month, user.budget, currency, fingerprint)
+        try:
+            async with aclosing(stream):
+                async for token in stream:
+                    if await request.is_disconnected():
+                        return  # closes the Groq stream; nothing is stored
+                    parts.append(token)
+                    yield _sse("token", {"text": token})
+        except Exception as e:
+            logger.warning(f"Insights stream failed: {e}")
+            yield _sse("error", {"insights": INSIGHTS_UNAVAILABLE})
+            return
+        
+        yield _sse("done", {"insights": "".join(parts).strip(), "rates_date": rates_date})
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
     )
-    db.add(summary)
-    await db.flush()
-    
-    return {"insights": insights}
 
 
 @router.post("/categorize")
 async def categorize_expense(
     data: CategorizeRequest,
     user_data: tuple = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
 ):
-    ai_service = get_ai_service()
-    category = await ai_service.categorize_transaction(data.amount, data.remarks)
+    firebase_uid, user = user_data
+    category = await get_categorizer().categorize(db, firebase_uid, data.amount, data.remarks)
     return {"category": category}
 
 
@@ -89,27 +152,8 @@ async def spike_detection(
     user_data: tuple = Depends(get_current_user),
     db: AsyncSession = Depends(get_db),
 ):
+    """This month's spend per category vs the trailing-months baseline (mean/stddev)."""
     firebase_uid, user = user_data
     
     now = datetime.now(timezone.utc)
-    current_month = now.month
-    current_year = now.year
-    
-    prev_month = current_month - 1 if current_month > 1 else 12
-    prev_year = current_year if current_month > 1 else current_year - 1
-    
-    result = await db.execute(
-        select(Transaction).where(Transaction.user_id == firebase_uid)
-    )
-    all_txns = result.scalars().all()
-    
-    current_str = f"{current_year}-{current_month:02d}"
-    prev_str = f"{prev_year}-{prev_month:02d}"
-    
-    current_txns = [t.to_dict() for t in all_txns if t.date.startswith(current_str)]
-    prev_txns = [t.to_dict() for t in all_txns if t.date.startswith(prev_str)]
-    
-    ai_service = get_ai_service()
-    warning = await ai_service.detect_spending_spike(current_txns, prev_txns)
-    
-    return {"warning": warning}
+    return await detect_spikes(db, firebase_uid, now.year, now.month)
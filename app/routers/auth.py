@@ -1,18 +1,23 @@
 # Auth routes
-from fastapi import APIRouter, Depends
-from sqlalchemy.ext.asyncio import AsyncSession
+from fastapi import APIRouter, Depends, Request
+from fastapi.responses import JSONResponse
 
+from ..core.etag import is_not_modified, make_etag, not_modified
 from ..schemas.user import UserResponse
-from ..dependencies import get_current_user
+from ..dependencies import get_versioned_user
 
 router = APIRouter(prefix="/auth", tags=["auth"])
 
 
 @router.get("/me", response_model=UserResponse)
-async def get_me(user_data: tuple = Depends(get_current_user)):
-    """Get current user. Creates user on first login."""
-    firebase_uid, user = user_data
-    return UserResponse(
+async def get_me(request: Request, user_data: tuple = Depends(get_versioned_user)):
+    """Get current user. Creates user on first login. Honours If-None-Match."""
+    firebase_uid, user, version = user_data
+    etag = make_etag("me", firebase_uid, version)
+    if is_not_modified(request, etag):
+        return not_modified(etag)
+    
+    body = UserResponse(
         id=user.id,
         email=user.email,
         currency=user.currency,
@@ -22,3 +27,4 @@ async def get_me(user_data: tuple = Depends(get_current_user)):
         is_currency_set=user.is_currency_set,
         created_at=user.created_at,
     )
+    return JSONResponse(body.model_dump(mode="json"), headers={"ETag": etag})
@@ -1,9 +1,13 @@
 # Currency conversion endpoints
+from datetime import date as date_type, datetime, timezone
+from typing import Optional
+
 from fastapi import APIRouter, HTTPException, Query
 import logging
 import re
 
-from ..services.currency import CurrencyService
+from ..schemas.currency import BatchConversionRequest, BatchConversionResponse
+from ..services.currency import RateCache, get_rate_cache
 
 
 logger = logging.getLogger(__name__)
@@ -26,8 +30,18 @@ def validate_currency_code(currency: str) -> str:
     return currency
 
 
+def unavailable(as_of: Optional[date_type], detail: str) -> HTTPException:
+    """404 for a past date with no stored snapshot, 503 when live rates are unavailable."""
+    if as_of is not None and as_of < datetime.now(timezone.utc).date():
+        return HTTPException(status_code=404, detail=f"No stored rates on or before {as_of.isoformat()}")
+    return HTTPException(status_code=503, detail=detail)
+
+
 @router.get("/rates/{currency}")
-async def get_rates(currency: str):
+async def get_rates(
+    currency: str,
+    as_of: Optional[date_type] = Query(None, alias="date", description="Use the rates in effect on this date"),
+):
     """
     Get conversion rates from a currency to all others.
     
@@ -36,34 +50,33 @@ async def get_rates(currency: str):
     """
     currency = validate_currency_code(currency)
     
-    async with CurrencyService() as service:
-        rates_data = await service.fetch_rates(base_currency=currency)
-        
-        if not rates_data:
-            raise HTTPException(
-                status_code=503,
-                detail=f"Failed to fetch rates for {currency}. Check your FX_API_KEY."
-            )
-        
-        return {
-            "from_currency": currency,
-            "conversions": rates_data["rates"],
-            "fetched_at": rates_data["fetched_at"].isoformat(),
-            "total_currencies": len(rates_data["rates"]),
-            "message": f"1 {currency} equals the following amounts in other currencies"
-        }
+    rates_data = await get_rate_cache().rates_for(currency, as_of)
+    
+    if not rates_data:
+        raise unavailable(as_of, f"Failed to fetch rates for {currency}. Check your FX_API_KEY.")
+    
+    return {
+        "from_currency": currency,
+        "conversions": rates_data["rates"],
+        "rates_date": rates_data["date"].isoformat(),
+        "source": rates_data["source"],
+        "fetched_at": rates_data["fetched_at"].isoformat(),
+        "total_currencies": len(rates_data["rates"]),
+        "message": f"1 {currency} equals the following amounts in other currencies"
+    }
 
 
 @router.get("/convert")
 async def convert_currency(
     amount: float = Query(..., description="Amount to convert"),
     from_currency: str = Query(..., alias="from", description="Source currency code"),
-    to_currency: str = Query(..., alias="to", description="Target currency code")
+    to_currency: str = Query(..., alias="to", description="Target currency code"),
+    as_of: Optional[date_type] = Query(None, alias="date", description="Use the rates in effect on this date"),
 ):
     """
     Convert an amount from one currency to another.
     
-    Example: /api/currency/convert?amount=100&from=USD&to=EUR
+    Example: /api/currency/convert?amount=100&from=USD&to=EUR&date=2026-01-31
     """
     from_currency = validate_currency_code(from_currency)
     to_currency = validate_currency_code(to_currency)
@@ -71,13 +84,46 @@ async def convert_currency(
     if amount <= 0:
         raise HTTPException(status_code=400, detail="Amount must be positive")
     
-    async with CurrencyService() as service:
-        result = await service.convert(amount, from_currency, to_currency)
-        
-        if not result:
-            raise HTTPException(
-                status_code=503,
-                detail=f"Failed to convert {from_currency} to {to_currency}. Check your FX_API_KEY."
-            )
+    result = await get_rate_cache().convert(amount, from_currency, to_currency, as_of)
+    
+    if not result:
+        raise unavailable(as_of, f"Failed to convert {from_currency} to {to_currency}. Check your FX_API_KEY.")
+    
+    return result
+
+
+@router.post("/convert/batch", response_model=BatchConversionResponse)
+async def convert_currency_batch(request: BatchConversionRequest):
+    """
+    Convert many amounts in one call.
+    
+    Every item is priced against the same cached rate table; each distinct
+    (from, to) pair is resolved once. Unknown currencies fail per item, not the batch.
+    """
+    table = await get_rate_cache().table(request.date)
+    if not table:
+        raise unavailable(request.date, "Failed to fetch rates. Check your FX_API_KEY.")
+    
+    pair_rates = {}
+    results = []
+    for item in request.items:
+        pair = (item.from_currency.upper(), item.to_currency.upper())
+        if pair not in pair_rates:
+            pair_rates[pair] = RateCache.cross_rate(table, *pair)
+        rate = pair_rates[pair]
         
-        return result
+        results.append({
+            "amount": item.amount,
+            "from_currency": pair[0],
+            "to_currency": pair[1],
+            "rate": rate,
+            "converted_amount": round(item.amount * rate, 2) if rate is not None else None,
+            "error": None if rate is not None else f"Unsupported currency pair {pair[0]}/{pair[1]}",
+        })
+    
+    return {
+        "results": results,
+        "rates_date": table["date"],
+        "source": table["source"],
+        "fetched_at": table["fetched_at"].isoformat(),
+    }
@@ -1,64 +1,146 @@
 # Dashboard summary routes
 from collections import defaultdict
-from typing import Dict, Any
+from datetime import timedelta
+from typing import Dict, Any, Iterable
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Query, Request
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, func
 
 from ..core.database import get_db
-from ..models.transaction import Transaction
-from ..dependencies import get_current_user
+from ..core.dates import MAX_YEAR, month_range
+from ..core.etag import is_not_modified, make_etag, not_modified
+from ..core.responses import FastJSONResponse
+from ..models.transaction import TRANSACTION_FIELDS, Transaction, MonthlyRollup
+from ..dependencies import get_versioned_user
+from ..services.currency import get_rate_cache
 
 router = APIRouter(prefix="/dashboard", tags=["dashboard"])
 
 
+def summarize_groups(groups: Iterable) -> Dict[str, Any]:
+    """Fold (type, category, source, total) groups into the dashboard totals."""
+    totals: Dict[str, Any] = {
+        "income": 0.0,
+        "expenses": 0.0,
+        "savings": 0.0,
+        "investments": 0.0,
+        "expenses_from_budget": 0.0,
+        "expenses_from_savings": 0.0,
+    }
+    category_breakdown: Dict[str, float] = defaultdict(float)
+    
+    for txn_type, category, source, total in groups:
+        total = total or 0.0
+        
+        if txn_type == "income":
+            totals["income"] += total
+            # For backwards compatibility, also calculate by category
+            if category == "Savings":
+                totals["savings"] += total
+        elif txn_type == "expense":
+            totals["expenses"] += total
+            category_breakdown[category] += total
+            
+            # Expenses by source
+            if source == "savings":
+                totals["expenses_from_savings"] += total
+            elif source in ("budget", None):
+                totals["expenses_from_budget"] += total
+        
+        if category == "Investment":
+            totals["investments"] += total
+    
+    totals["category_breakdown"] = dict(category_breakdown)
+    return totals
+
+
 @router.get("/summary")
 async def get_dashboard_summary(
-    month: int,
-    year: int,
-    user_data: tuple = Depends(get_current_user),
+    request: Request,
+    month: int = Query(..., ge=1, le=12),
+    year: int = Query(..., ge=1, le=MAX_YEAR),
+    user_data: tuple = Depends(get_versioned_user),
     db: AsyncSession = Depends(get_db),
-) -> Dict[str, Any]:
-    firebase_uid, user = user_data
+) -> FastJSONResponse:
+    firebase_uid, user, version = user_data
+    currency = (user.currency or "USD").upper()
+    start, end = month_range(year, month)
+    rates_as_of = end - timedelta(days=1)
     
-    result = await db.execute(
-        select(Transaction).where(Transaction.user_id == firebase_uid)
+    in_month = (
+        Transaction.user_id == firebase_uid,
+        Transaction.date >= start,
+        Transaction.date < end,
     )
-    all_transactions = result.scalars().all()
     
-    month_str = f"{year}-{month:02d}"
-    month_txns = [t for t in all_transactions if t.date.startswith(month_str)]
+    # Totals come from the incrementally maintained rollups: O(categories), not O(rows)
+    groups = (
+        await db.execute(
+            select(
+                MonthlyRollup.type,
+                MonthlyRollup.category,
+                func.nullif(MonthlyRollup.source, ""),
+                MonthlyRollup.currency,
+                MonthlyRollup.total,
+            )
+            .where(
+                MonthlyRollup.user_id == firebase_uid,
+                MonthlyRollup.year == year,
+                MonthlyRollup.month == month,
+            )
+        )
+    ).all()
+    month_currencies = {group[3] for group in groups}
     
-    # Calculate totals based on transaction type
-    income = sum(t.amount for t in month_txns if t.type == "income")
-    expenses = sum(t.amount for t in month_txns if t.type == "expense")
+    async def make_dashboard_etag() -> str:
+        # Converted totals also change with the rate table - but only months with foreign rows convert
+        fx_version = ""
+        if any(code.upper() != currency for code in month_currencies):
+            fx_version = await get_rate_cache().snapshot_version(rates_as_of)
+        return make_etag("dashboard", firebase_uid, version, year, month, fx_version)
     
-    # For backwards compatibility, also calculate by category
-    savings_contributions = sum(t.amount for t in month_txns if t.category == "Savings" and t.type == "income")
-    investments = sum(t.amount for t in month_txns if t.category == "Investment")
+    # Rollups are a handful of rows; the transactions query below is what a 304 saves
+    etag = await make_dashboard_etag()
+    if is_not_modified(request, etag):
+        return not_modified(etag)
     
-    # Expenses by source
-    expenses_from_budget = sum(t.amount for t in month_txns if t.type == "expense" and (t.source == "budget" or t.source is None))
-    expenses_from_savings = sum(t.amount for t in month_txns if t.type == "expense" and t.source == "savings")
-    
-    category_breakdown: Dict[str, float] = defaultdict(float)
-    for t in month_txns:
-        if t.type == "expense":
-            category_breakdown[t.category] += t.amount
+    # One rate per distinct currency (month-end rates), applied to every group in the user's currency.
+    # Currencies without a rate are left out of the totals and listed in unconverted_currencies.
+    factors, fx = await get_rate_cache().factors(month_currencies, currency, as_of=rates_as_of)
+    unconverted = sorted(month_currencies - factors.keys())
+    totals = summarize_groups(
+        (txn_type, category, source, total * factors[code])
+        for txn_type, category, source, code, total in groups
+        if code in factors
+    )
     
-    # Sort transactions by date descending (latest first)
-    sorted_txns = sorted(month_txns, key=lambda t: (t.date, t.created_at.isoformat() if t.created_at else ""), reverse=True)
+    # Latest first; column rows go straight to orjson without building entities
+    result = await db.execute(
+        select(*(getattr(Transaction, f) for f in TRANSACTION_FIELDS))
+        .where(*in_month)
+        .order_by(Transaction.date.desc(), Transaction.created_at.desc())
+    )
+    amount_at, currency_at = TRANSACTION_FIELDS.index("amount"), TRANSACTION_FIELDS.index("currency")
+    transactions = []
+    for row in result.all():
+        txn = dict(zip(TRANSACTION_FIELDS, row))
+        factor = factors.get(row[currency_at])
+        txn["converted_amount"] = round(row[amount_at] * factor, 2) if factor is not None else None
+        transactions.append(txn)
     
-    return {
-        "income": income,
-        "expenses": expenses,
-        "savings": savings_contributions,
-        "investments": investments,
+    return FastJSONResponse({
+        "income": totals["income"],
+        "expenses": totals["expenses"],
+        "savings": totals["savings"],
+        "investments": totals["investments"],
         "savings_balance": user.savings_balance,
-        "expenses_from_budget": expenses_from_budget,
-        "expenses_from_savings": expenses_from_savings,
-        "category_breakdown": dict(category_breakdown),
+        "expenses_from_budget": totals["expenses_from_budget"],
+        "expenses_from_savings": totals["expenses_from_savings"],
+        "category_breakdown": totals["category_breakdown"],
         "budget": user.budget,
-        "transactions": [t.to_dict() for t in sorted_txns],
-    }
+        "currency": currency,
+        "fx": fx,  # rate snapshot used for conversion; None when every row is in `currency`
+        "unconverted_currencies": unconverted,
+        "transactions": transactions,
+    }, headers={"ETag": await make_dashboard_etag()})  # factors() may have refreshed the table
@@ -1,32 +1,118 @@
 # Transaction CRUD routes
-from typing import List, Optional
+import base64
+import binascii
+import csv
+import io
+import json
+from datetime import date, datetime
+from typing import AsyncIterator, BinaryIO, List, Literal, Optional
 from uuid import UUID
 
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, File, HTTPException, Query, Request, UploadFile
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, delete
+from sqlalchemy import select, delete, insert, tuple_
 
-from ..core.database import get_db
-from ..models.transaction import Transaction
+from ..core.config import get_settings
+from ..core.database import get_db, session_factory
+from ..core.etag import is_not_modified, make_etag, not_modified
+from ..core.responses import FastJSONResponse
+from ..models.transaction import TRANSACTION_FIELDS, Transaction
 from ..models.user import User
-from ..schemas.transaction import TransactionCreate, TransactionUpdate, TransactionResponse
-from ..dependencies import get_current_user
-from ..services.ai import get_ai_service
+from ..schemas.transaction import (
+    TransactionCreate,
+    TransactionUpdate,
+    TransactionResponse,
+    TransactionImportResult,
+)
+from ..dependencies import (
+    bump_data_version,
+    get_current_user,
+    get_current_user_id,
+    get_versioned_user,
+    lock_user,
+)
+from ..services.categorizer import get_categorizer
+from ..services.spikes import invalidate_spikes
+from ..services.rollups import (
+    new_deltas,
+    add_delta,
+    rollup_key,
+    rollup_key_from_row,
+    apply_rollup_deltas,
+)
 
 router = APIRouter(prefix="/transactions", tags=["transactions"])
 
 
+# Sort mode -> (leading column, descending). Ties break on created_at, then id, in the same direction.
+SORTS = {
+    "latest": (Transaction.date, True),
+    "oldest": (Transaction.date, False),
+    "amount_asc": (Transaction.amount, False),
+    "amount_desc": (Transaction.amount, True),
+}
+
+DEFAULT_PAGE_SIZE = 50
+
+
+TRANSACTION_COLUMNS = tuple(getattr(Transaction, f) for f in TRANSACTION_FIELDS)
+
+
+def transaction_payload(txn: Transaction) -> dict:
+    """TransactionResponse-shaped dict for FastJSONResponse."""
+    payload = {f: getattr(txn, f) for f in TRANSACTION_FIELDS}
+    payload["type"] = payload["type"] or "expense"
+    return payload
+
+
+async def _data_changed(db: AsyncSession, user_id: str) -> None:
+    """After every transaction write: new data version (ETags) and no cached spike results."""
+    await bump_data_version(db, user_id)
+    invalidate_spikes(user_id)
+
+
+def encode_cursor(sort: str, txn) -> str:
+    lead = txn.date.isoformat() if sort in ("latest", "oldest") else txn.amount
+    payload = [sort, lead, txn.created_at.isoformat(), str(txn.id)]
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode().rstrip("=")
+
+
+def decode_cursor(sort: str, cursor: str) -> tuple:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        cursor_sort, lead, created_at, txn_id = json.loads(base64.urlsafe_b64decode(padded))
+        if cursor_sort != sort:
+            raise ValueError("cursor was issued for a different sort")
+        lead = date.fromisoformat(lead) if sort in ("latest", "oldest") else float(lead)
+        return lead, datetime.fromisoformat(created_at), UUID(txn_id)
+    except (ValueError, TypeError, binascii.Error):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
 @router.get("", response_model=List[TransactionResponse])
 async def get_transactions(
+    request: Request,
     sort: Optional[str] = Query("latest", regex="^(latest|oldest|amount_asc|amount_desc)$"),
     type_filter: Optional[str] = Query(None, regex="^(income|expense)$"),
     category: Optional[str] = None,
-    user_data: tuple = Depends(get_current_user),
+    limit: Optional[int] = Query(None, ge=1, le=500, description="Page size; enables pagination"),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor from the previous page"),
+    user_data: tuple = Depends(get_versioned_user),
     db: AsyncSession = Depends(get_db),
 ):
-    firebase_uid, user = user_data
+    """List transactions. With `limit`/`cursor`, returns one keyset page and sets X-Next-Cursor.
     
-    query = select(Transaction).where(Transaction.user_id == firebase_uid)
+    Honours If-None-Match: an unchanged list costs one primary-key lookup.
+    """
+    firebase_uid, user, version = user_data
+    etag = make_etag("transactions", firebase_uid, version, sort, type_filter, category, limit, cursor)
+    if is_not_modified(request, etag):
+        return not_modified(etag)
+    
+    # Plain column rows, not entities: serialized directly below without building models
+    query = select(*TRANSACTION_COLUMNS).where(Transaction.user_id == firebase_uid)
     
     # Apply type filter
     if type_filter:
@@ -37,33 +123,100 @@ async def get_transactions(
         query = query.where(Transaction.category == category)
     
     # Apply sorting
-    if sort == "latest":
-        query = query.order_by(Transaction.date.desc(), Transaction.created_at.desc())
-    elif sort == "oldest":
-        query = query.order_by(Transaction.date.asc(), Transaction.created_at.asc())
-    elif sort == "amount_asc":
-        query = query.order_by(Transaction.amount.asc())
-    elif sort == "amount_desc":
-        query = query.order_by(Transaction.amount.desc())
+    lead, descending = SORTS[sort]
+    keys = (lead, Transaction.created_at, Transaction.id)
+    query = query.order_by(*(k.desc() if descending else k.asc() for k in keys))
+    
+    paginate = limit is not None or cursor is not None
+    if paginate:
+        page_size = limit or DEFAULT_PAGE_SIZE
+        if cursor:
+            # Seek past the last row of the previous page - same cost for every page
+            after = decode_cursor(sort, cursor)
+            query = query.where(tuple_(*keys) < after if descending else tuple_(*keys) > after)
+        query = query.limit(page_size + 1)
     
     result = await db.execute(query)
-    transactions = result.scalars().all()
-    
-    return [
-        TransactionResponse(
-            id=str(t.id),
-            user_id=t.user_id,
-            amount=t.amount,
-            currency=t.currency,
-            category=t.category,
-            remarks=t.remarks,
-            date=t.date,
-            type=t.type or "expense",
-            source=t.source,
-            created_at=t.created_at,
+    rows = result.all()
+    
+    headers = {"ETag": etag}
+    if paginate and len(rows) > page_size:
+        rows = rows[:page_size]
+        headers["X-Next-Cursor"] = encode_cursor(sort, rows[-1])
+    
+    return FastJSONResponse(
+        [dict(zip(TRANSACTION_FIELDS, row)) for row in rows],
+        headers=headers,
+    )
+
+
+EXPORT_COLUMNS = ("id", "date", "type", "amount", "currency", "category", "source", "remarks", "created_at")
+EXPORT_BATCH_SIZE = 1000
+
+
+def _export_value(value):
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    if isinstance(value, UUID):
+        return str(value)
+    return value
+
+
+def _encode_batch(rows, fmt: str) -> str:
+    if fmt == "ndjson":
+        return "".join(
+            json.dumps(dict(zip(EXPORT_COLUMNS, map(_export_value, row)))) + "\n"
+            for row in rows
         )
-        for t in transactions
-    ]
+    
+    buf = io.StringIO()
+    csv.writer(buf).writerows([_export_value(v) for v in row] for row in rows)
+    return buf.getvalue()
+
+
+async def _stream_export(
+    user_id: str, fmt: str, start: Optional[date], end: Optional[date]
+) -> AsyncIterator[str]:
+    if fmt == "csv":
+        yield _encode_batch([EXPORT_COLUMNS], fmt)
+    
+    query = (
+        select(*(getattr(Transaction, c) for c in EXPORT_COLUMNS))
+        .where(Transaction.user_id == user_id)
+        .order_by(Transaction.date, Transaction.created_at, Transaction.id)
+        .execution_options(yield_per=EXPORT_BATCH_SIZE)
+    )
+    if start:
+        query = query.where(Transaction.date >= start)
+    if end:
+        query = query.where(Transaction.date <= end)
+    
+    # Own session: the request-scoped one must not be held open for the whole download.
+    # Server-side cursor, so only one batch is in memory at a time.
+    factory = session_factory()
+    async with factory() as db:
+        result = await db.stream(query)
+        async for rows in result.partitions():
+            yield _encode_batch(rows, fmt)
+
+
+@router.get("/export")
+async def export_transactions(
+    format: Literal["csv", "ndjson"] = "csv",
+    start: Optional[date] = Query(None, description="First date to include (YYYY-MM-DD)"),
+    end: Optional[date] = Query(None, description="Last date to include (YYYY-MM-DD)"),
+    firebase_uid: str = Depends(get_current_user_id),
+):
+    """Stream the user's full transaction history as CSV or NDJSON, oldest first."""
+    if start and end and start > end:
+        raise HTTPException(status_code=400, detail="start must be on or before end")
+    
+    media_type = "text/csv" if format == "csv" else "application/x-ndjson"
+    return StreamingResponse(
+        _stream_export(firebase_uid, format, start, end),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="transactions.{format}"'},
+    )
 
 
 @router.post("", response_model=TransactionResponse)
@@ -76,9 +229,10 @@ async def create_transaction(
     
     # AI categorization if category is empty or "Other"
     category = txn_data.category
-    if (not category or category == "Other") and txn_data.remarks:
-        ai_service = get_ai_service()
-        category = await ai_service.categorize_transaction(txn_data.amount, txn_data.remarks)
+    categorizer = get_categorizer()
+    auto_categorized = (not category or category == "Other") and txn_data.remarks
+    if auto_categorized:
+        category = await categorizer.categorize(db, firebase_uid, txn_data.amount, txn_data.remarks)
     
     # Default to user's currency if not provided
     currency = txn_data.currency or user.currency or "USD"
@@ -88,23 +242,32 @@ async def create_transaction(
     if txn_data.type == "expense":
         source = txn_data.source or "budget"
         
-        # Validate savings balance if spending from savings
-        if source == "savings" and user.savings_balance < txn_data.amount:
-            raise HTTPException(
-                status_code=400, 
-                detail=f"Insufficient savings balance. Available: {user.savings_balance}"
-            )
-        
-        # Deduct from savings if source is savings
         if source == "savings":
+            user = await lock_user(db, firebase_uid)
+            
+            # Validate savings balance if spending from savings
+            if user.savings_balance < txn_data.amount:
+                raise HTTPException(
+                    status_code=400, 
+                    detail=f"Insufficient savings balance. Available: {user.savings_balance}"
+                )
+            
+            # Deduct from savings
             user.savings_balance -= txn_data.amount
             
     elif txn_data.type == "income":
         # Add to savings if requested
         if txn_data.add_to_savings:
+            user = await lock_user(db, firebase_uid)
             user.savings_balance += txn_data.amount
             category = "Savings"  # Override category for savings income
     
+    # Only after validation: a rejected request must not leave an override or train the model
+    if not auto_categorized:
+        await categorizer.record_label(
+            db, firebase_uid, txn_data.amount, txn_data.remarks, txn_data.category
+        )
+    
     transaction = Transaction(
         user_id=firebase_uid,
         amount=txn_data.amount,
@@ -117,22 +280,150 @@ async def create_transaction(
     )
     
     db.add(transaction)
+    
+    deltas = new_deltas()
+    add_delta(deltas, rollup_key(transaction), transaction.amount, +1)
+    await apply_rollup_deltas(db, firebase_uid, deltas)
+    await _data_changed(db, firebase_uid)
+    await db.flush()
+    
+    return FastJSONResponse(transaction_payload(transaction))
+
+
+async def _import_transactions(
+    db: AsyncSession, firebase_uid: str, user: User, items: List[TransactionCreate]
+) -> TransactionImportResult:
+    """Insert many transactions with the same rules as create_transaction, in one batch."""
+    if not items:
+        raise HTTPException(status_code=400, detail="No transactions to import")
+    
+    max_rows = get_settings().import_max_rows
+    if len(items) > max_rows:
+        raise HTTPException(status_code=413, detail=f"Import is limited to {max_rows} rows")
+    
+    # AI categorization, as one group, for rows with an empty or "Other" category
+    needs_ai = [
+        i for i, item in enumerate(items)
+        if (not item.category or item.category == "Other") and item.remarks
+        and not (item.type == "income" and item.add_to_savings)
+    ]
+    categories = [item.category for item in items]
+    if needs_ai:
+        suggested = await get_categorizer().categorize_many(
+            db, firebase_uid, [(items[i].amount, items[i].remarks) for i in needs_ai]
+        )
+        for i, category in zip(needs_ai, suggested):
+            categories[i] = category
+    
+    touches_savings = any(
+        (item.type == "expense" and item.source == "savings")
+        or (item.type == "income" and item.add_to_savings)
+        for item in items
+    )
+    if touches_savings:
+        user = await lock_user(db, firebase_uid)
+    balance = user.savings_balance
+    
+    rows = []
+    deltas = new_deltas()
+    for line, (item, category) in enumerate(zip(items, categories), start=1):
+        source = None
+        if item.type == "expense":
+            source = item.source or "budget"
+            if source == "savings":
+                # Rows apply in order, so a later savings deposit can't fund an earlier withdrawal
+                if balance < item.amount:
+                    raise HTTPException(
+                        status_code=400,
+                        detail=f"Row {line}: insufficient savings balance. Available: {balance}",
+                    )
+                balance -= item.amount
+        elif item.add_to_savings:
+            balance += item.amount
+            category = "Savings"
+        
+        row = {
+            "user_id": firebase_uid,
+            "amount": item.amount,
+            "currency": item.currency or user.currency or "USD",
+            "category": category,
+            "remarks": item.remarks,
+            "date": item.date,
+            "type": item.type,
+            "source": source,
+        }
+        rows.append(row)
+        add_delta(deltas, rollup_key_from_row(row), item.amount, +1)
+    
+    # Batched multi-row INSERT; net savings change is a single UPDATE of the locked row
+    await db.execute(insert(Transaction), rows)
+    await apply_rollup_deltas(db, firebase_uid, deltas)
+    await _data_changed(db, firebase_uid)
+    if touches_savings:
+        user.savings_balance = balance
     await db.flush()
     
-    return TransactionResponse(
-        id=str(transaction.id),
-        user_id=transaction.user_id,
-        amount=transaction.amount,
-        currency=transaction.currency,
-        category=transaction.category,
-        remarks=transaction.remarks,
-        date=transaction.date,
-        type=transaction.type,
-        source=transaction.source,
-        created_at=transaction.created_at,
+    return TransactionImportResult(
+        imported=len(rows),
+        auto_categorized=len(needs_ai),
+        savings_balance=balance,
     )
 
 
+def _parse_import_csv(upload: BinaryIO) -> List[TransactionCreate]:
+    max_rows = get_settings().import_max_rows
+    text = io.TextIOWrapper(upload, encoding="utf-8-sig", newline="")
+    items, errors = [], []
+    try:
+        # Header is line 1; blank cells fall back to the field defaults. A blank or
+        # missing category is "" so the row goes through AI categorization.
+        for line, raw in enumerate(csv.DictReader(text), start=2):
+            if line - 1 > max_rows:
+                raise HTTPException(status_code=413, detail=f"Import is limited to {max_rows} rows")
+            data = {
+                key.strip(): value.strip()
+                for key, value in raw.items()
+                if key and isinstance(value, str) and value.strip()
+            }
+            data.setdefault("category", "")
+            try:
+                items.append(TransactionCreate.model_validate(data))
+            except ValidationError as e:
+                errors.append({"line": line, "errors": e.errors(include_url=False, include_context=False)})
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=400, detail="CSV must be UTF-8 encoded")
+    finally:
+        # Leave the upload's file open for UploadFile to close
+        text.detach()
+    
+    if errors:
+        raise HTTPException(status_code=422, detail=errors[:50])
+    return items
+
+
+@router.post("/import", response_model=TransactionImportResult)
+async def import_transactions(
+    items: List[TransactionCreate],
+    user_data: tuple = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    """Bulk-create transactions from a JSON array. All rows are stored, or none."""
+    firebase_uid, user = user_data
+    return await _import_transactions(db, firebase_uid, user, items)
+
+
+@router.post("/import/csv", response_model=TransactionImportResult)
+async def import_transactions_csv(
+    file: UploadFile = File(..., description="CSV with a header row of TransactionCreate fields"),
+    user_data: tuple = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    """Bulk-create transactions from a CSV upload. All rows are stored, or none."""
+    firebase_uid, user = user_data
+    items = _parse_import_csv(file.file)
+    return await _import_transactions(db, firebase_uid, user, items)
+
+
 @router.put("/{transaction_id}", response_model=TransactionResponse)
 async def update_transaction(
     transaction_id: str,
@@ -147,9 +438,12 @@ async def update_transaction(
     except ValueError:
         raise HTTPException(status_code=400, detail="Invalid transaction ID")
     
+    # Row lock: a concurrent update/delete of the same id waits and then sees the
+    # committed row (or none), so the rollup delta is taken from the old values once
     result = await db.execute(
         select(Transaction)
         .where(Transaction.id == txn_uuid, Transaction.user_id == firebase_uid)
+        .with_for_update()
     )
     transaction = result.scalar_one_or_none()
     
@@ -160,6 +454,7 @@ async def update_transaction(
     old_source = transaction.source
     old_amount = transaction.amount
     old_type = transaction.type
+    old_key = rollup_key(transaction)
     
     update_data = txn_data.model_dump(exclude_unset=True)
     for field, value in update_data.items():
@@ -167,6 +462,11 @@ async def update_transaction(
             setattr(transaction, field, value)
     
     # Adjust savings if needed
+    if (old_type == "expense" and old_source == "savings") or (
+        transaction.type == "expense" and transaction.source == "savings"
+    ):
+        user = await lock_user(db, firebase_uid)
+    
     if old_type == "expense" and old_source == "savings":
         # Return old amount to savings
         user.savings_balance += old_amount
@@ -177,20 +477,21 @@ async def update_transaction(
             raise HTTPException(status_code=400, detail="Insufficient savings balance")
         user.savings_balance -= transaction.amount
     
+    if update_data.get("category"):
+        await get_categorizer().record_label(
+            db, firebase_uid, transaction.amount, transaction.remarks, transaction.category
+        )
+    
+    # Moves between months/categories net out to a decrement on the old key
+    deltas = new_deltas()
+    add_delta(deltas, old_key, old_amount, -1)
+    add_delta(deltas, rollup_key(transaction), transaction.amount, +1)
+    await apply_rollup_deltas(db, firebase_uid, deltas)
+    await _data_changed(db, firebase_uid)
+    
     await db.flush()
     
-    return TransactionResponse(
-        id=str(transaction.id),
-        user_id=transaction.user_id,
-        amount=transaction.amount,
-        currency=transaction.currency,
-        category=transaction.category,
-        remarks=transaction.remarks,
-        date=transaction.date,
-        type=transaction.type or "expense",
-        source=transaction.source,
-        created_at=transaction.created_at,
-    )
+    return FastJSONResponse(transaction_payload(transaction))
 
 
 @router.delete("/{transaction_id}")
@@ -206,16 +507,24 @@ async def delete_transaction(
     except ValueError:
         raise HTTPException(status_code=400, detail="Invalid transaction ID")
     
-    # First get the transaction to check if we need to adjust savings
+    # First get the transaction to check if we need to adjust savings. Locked, so a
+    # retried DELETE waits for the first one and then finds nothing (404) instead of
+    # applying the rollup and savings adjustments a second time.
     result = await db.execute(
         select(Transaction)
         .where(Transaction.id == txn_uuid, Transaction.user_id == firebase_uid)
+        .with_for_update()
     )
     transaction = result.scalar_one_or_none()
     
     if not transaction:
         raise HTTPException(status_code=404, detail="Transaction not found")
     
+    if (transaction.type == "expense" and transaction.source == "savings") or (
+        transaction.type == "income" and transaction.category == "Savings"
+    ):
+        user = await lock_user(db, firebase_uid)
+    
     # Restore savings if this was an expense from savings
     if transaction.type == "expense" and transaction.source == "savings":
         user.savings_balance += transaction.amount
@@ -224,6 +533,11 @@ async def delete_transaction(
     if transaction.type == "income" and transaction.category == "Savings":
         user.savings_balance -= transaction.amount
     
+    deltas = new_deltas()
+    add_delta(deltas, rollup_key(transaction), transaction.amount, -1)
+    await apply_rollup_deltas(db, firebase_uid, deltas)
+    await _data_changed(db, firebase_uid)
+    
     await db.execute(
         delete(Transaction).where(Transaction.id == txn_uuid)
     )
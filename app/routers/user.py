@@ -4,7 +4,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from ..core.database import get_db
 from ..schemas.user import UserSettings, UserResponse
-from ..dependencies import get_current_user
+from ..dependencies import bump_data_version, get_current_user, lock_user
 
 router = APIRouter(prefix="/user", tags=["user"])
 
@@ -15,7 +15,8 @@ async def update_settings(
     user_data: tuple = Depends(get_current_user),
     db: AsyncSession = Depends(get_db),
 ):
-    firebase_uid, user = user_data
+    firebase_uid, _ = user_data
+    user = await lock_user(db, firebase_uid)
     
     update_data = settings.model_dump(exclude_unset=True)
     
@@ -26,6 +27,7 @@ async def update_settings(
     if "currency" in update_data and update_data["currency"] is not None:
         user.is_currency_set = True
     
+    await bump_data_version(db, firebase_uid)
     await db.flush()
     
     return UserResponse(
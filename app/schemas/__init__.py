@@ -1,6 +1,13 @@
 # Pydantic Schemas
 from .user import UserSettings, UserResponse
-from .transaction import TransactionCreate, TransactionUpdate, TransactionResponse, CategorizeRequest
+from .transaction import (
+    TransactionCreate,
+    TransactionUpdate,
+    TransactionResponse,
+    TransactionImportResult,
+    CategorizeRequest,
+)
+from .currency import ConversionItem, BatchConversionRequest, ConversionResult, BatchConversionResponse
 
 __all__ = [
     "UserSettings",
@@ -8,5 +15,10 @@ __all__ = [
     "TransactionCreate",
     "TransactionUpdate",
     "TransactionResponse",
+    "TransactionImportResult",
     "CategorizeRequest",
+    "ConversionItem",
+    "BatchConversionRequest",
+    "ConversionResult",
+    "BatchConversionResponse",
 ]
@@ -0,0 +1,35 @@
+# Currency conversion request/response schemas
+from datetime import date as date_type
+from typing import List, Optional
+from pydantic import BaseModel, ConfigDict, Field
+
+MAX_BATCH_CONVERSIONS = 1000
+
+
+class ConversionItem(BaseModel):
+    model_config = ConfigDict(populate_by_name=True)
+    
+    amount: float = Field(..., gt=0)
+    from_currency: str = Field(..., alias="from", pattern=r"^[A-Za-z]{3}$")
+    to_currency: str = Field(..., alias="to", pattern=r"^[A-Za-z]{3}$")
+
+
+class BatchConversionRequest(BaseModel):
+    items: List[ConversionItem] = Field(..., min_length=1, max_length=MAX_BATCH_CONVERSIONS)
+    date: Optional[date_type] = None  # rates in effect on this date; latest if omitted
+
+
+class ConversionResult(BaseModel):
+    amount: float
+    from_currency: str
+    to_currency: str
+    rate: Optional[float] = None
+    converted_amount: Optional[float] = None
+    error: Optional[str] = None  # set (and rate/converted_amount None) for unknown currencies
+
+
+class BatchConversionResponse(BaseModel):
+    results: List[ConversionResult]
+    rates_date: date_type
+    source: str  # "live" or "stored"
+    fetched_at: str
@@ -1,5 +1,5 @@
 # Transaction request/response schemas
-from datetime import datetime
+from datetime import date as date_type, datetime
 from typing import Optional, Literal
 from pydantic import BaseModel
 
@@ -8,7 +8,7 @@ class TransactionCreate(BaseModel):
     amount: float
     category: str
     remarks: Optional[str] = None
-    date: str  # YYYY-MM-DD
+    date: date_type  # YYYY-MM-DD
     currency: Optional[str] = None  # Defaults to user's currency if not provided
     type: Literal["income", "expense"] = "expense"
     source: Optional[Literal["budget", "savings"]] = None  # Only for expenses
@@ -19,7 +19,7 @@ class TransactionUpdate(BaseModel):
     amount: Optional[float] = None
     category: Optional[str] = None
     remarks: Optional[str] = None
-    date: Optional[str] = None
+    date: Optional[date_type] = None
     currency: Optional[str] = None
     type: Optional[Literal["income", "expense"]] = None
     source: Optional[Literal["budget", "savings"]] = None
@@ -32,7 +32,7 @@ class TransactionResponse(BaseModel):
     currency: str
     category: str
     remarks: Optional[str] = None
-    date: str
+    date: date_type
     type: str
     source: Optional[str] = None
     created_at: Optional[datetime] = None
@@ -41,6 +41,12 @@ class TransactionResponse(BaseModel):
         from_attributes = True
 
 
+class TransactionImportResult(BaseModel):
+    imported: int
+    auto_categorized: int
+    savings_balance: float
+
+
 class CategorizeRequest(BaseModel):
     amount: float
     remarks: str
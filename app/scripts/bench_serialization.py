@@ -0,0 +1,101 @@
+# Per-row cost of transaction list serialization, old path vs FastJSONResponse
+#
+#   python -m app.scripts.bench_serialization [--rows 1000] [--repeat 20]
+#
+# "before" mirrors what FastAPI did for the list/create/update endpoints: build
+# TransactionResponse per row, dump it, re-validate through response_model, then
+# json.dumps; and to_dict + jsonable_encoder + json.dumps for the dashboard.
+# "after" is dict(zip(fields, row)) + orjson, as the endpoints now do.
+import argparse
+import json
+import time
+import uuid
+from datetime import date, datetime, timedelta
+from types import SimpleNamespace
+from typing import List
+
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+
+from ..core.responses import FastJSONResponse
+from ..models.transaction import TRANSACTION_FIELDS, Transaction
+from ..schemas.transaction import TransactionResponse
+
+
+def make_rows(n: int) -> List[tuple]:
+    now = datetime(2026, 1, 31, 12, 0, 0, 123456)
+    categories = ("Food", "Rent", "Travel", "Bills", "Shopping")
+    return [
+        (
+            uuid.uuid4(), "user-1", 10.5 + i, "USD", categories[i % 5], f"remark {i}",
+            date(2026, 1, 1) + timedelta(days=i % 31), "expense", "budget", now - timedelta(minutes=i),
+        )
+        for i in range(n)
+    ]
+
+
+def render_json(content) -> bytes:
+    # starlette JSONResponse.render
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode()
+
+
+def list_before(objs, adapter: TypeAdapter) -> bytes:
+    models = [
+        TransactionResponse(
+            id=str(t.id), user_id=t.user_id, amount=t.amount, currency=t.currency,
+            category=t.category, remarks=t.remarks, date=t.date, type=t.type or "expense",
+            source=t.source, created_at=t.created_at,
+        )
+        for t in objs
+    ]
+    # FastAPI: dump returned models, validate against response_model, serialize in json mode
+    validated = adapter.validate_python([m.model_dump() for m in models])
+    return render_json(adapter.dump_python(validated, mode="json"))
+
+
+def list_after(rows) -> bytes:
+    return FastJSONResponse([dict(zip(TRANSACTION_FIELDS, row)) for row in rows]).body
+
+
+def dashboard_before(objs) -> bytes:
+    return render_json(jsonable_encoder({"transactions": [Transaction.to_dict(t) for t in objs]}))
+
+
+def dashboard_after(rows) -> bytes:
+    return FastJSONResponse({"transactions": [dict(zip(TRANSACTION_FIELDS, row)) for row in rows]}).body
+
+
+def best_of(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main(n: int, repeat: int) -> None:
+    rows = make_rows(n)
+    objs = [SimpleNamespace(**dict(zip(TRANSACTION_FIELDS, row))) for row in rows]
+    adapter = TypeAdapter(List[TransactionResponse])
+    
+    # Same payload either way
+    assert json.loads(list_before(objs, adapter)) == json.loads(list_after(rows))
+    
+    cases = [
+        ("transactions list", lambda: list_before(objs, adapter), lambda: list_after(rows)),
+        ("dashboard rows", lambda: dashboard_before(objs), lambda: dashboard_after(rows)),
+    ]
+    print(f"{n} rows, best of {repeat}")
+    for name, before, after in cases:
+        t_before = best_of(before, repeat) / n * 1e6
+        t_after = best_of(after, repeat) / n * 1e6
+        print(f"{name:18} before {t_before:7.2f} us/row   after {t_after:6.2f} us/row   {t_before / t_after:5.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+    main(args.rows, args.repeat)
@@ -0,0 +1,38 @@
+# Recompute monthly_rollups from raw transactions
+#
+#   python -m app.scripts.rebuild_rollups [--user UID] [--check]
+#
+# --check only reports rollups that drifted from the transactions table.
+import argparse
+import asyncio
+import sys
+
+from ..core.database import session_factory, close_db
+from ..services.rollups import rebuild_rollups, find_rollup_drift
+
+
+async def main(user_id: str | None, check: bool) -> int:
+    factory = session_factory()
+    try:
+        async with factory() as db:
+            if check:
+                drift = await find_rollup_drift(db, user_id)
+                for item in drift:
+                    print(f"{item['key']}: expected {item['expected']}, stored {item['stored']}")
+                print(f"{len(drift)} rollup(s) out of sync")
+                return 1 if drift else 0
+            
+            await rebuild_rollups(db, user_id)
+            await db.commit()
+            print(f"Rebuilt rollups for {user_id or 'all users'}")
+            return 0
+    finally:
+        await close_db()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--user", help="Only this user id")
+    parser.add_argument("--check", action="store_true", help="Report drift without writing")
+    args = parser.parse_args()
+    sys.exit(asyncio.run(main(args.user, args.check)))
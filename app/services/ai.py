@@ -1,29 +1,242 @@
 # Groq AI service for categorization and insights
+import asyncio
 from collections import defaultdict
-from typing import Optional, List
+from typing import AsyncIterator, Optional, List, Tuple
 import logging
+import random
+import re
+import time
 
-from groq import Groq
+from groq import AsyncGroq, APIConnectionError, APITimeoutError, InternalServerError, RateLimitError
 
 from ..core.config import get_settings
+from ..core.http import get_http_client
 
 logger = logging.getLogger(__name__)
 
+RETRYABLE_ERRORS = (
+    asyncio.TimeoutError,
+    APIConnectionError,
+    APITimeoutError,
+    InternalServerError,
+    RateLimitError,
+)
+
+# Fallback text when Groq fails - never cached as a month's insights
+INSIGHTS_UNAVAILABLE = "Unable to generate insights at this time."
+
+VALID_CATEGORIES = ["Food", "Rent", "Travel", "Bills", "Shopping", "Savings", "Investment", "Other"]
+
+_NUMBERED_LINE = re.compile(r"^\s*(\d+)\s*[.):\-]\s*([A-Za-z]+)")
+
+
+def parse_numbered_reply(reply: str, count: int) -> Optional[List[str]]:
+    """Categories from a "<number>. <category>" reply, in order; None unless 1..count all appear.
+    
+    Unknown category names become "Other".
+    """
+    parsed = {}
+    for line in reply.splitlines():
+        match = _NUMBERED_LINE.match(line)
+        if match:
+            parsed[int(match.group(1))] = match.group(2).capitalize()
+    
+    if set(parsed) != set(range(1, count + 1)):
+        return None
+    return [
+        parsed[i] if parsed[i] in VALID_CATEGORIES else "Other"
+        for i in range(1, count + 1)
+    ]
+
+
+class AIUnavailable(Exception):
+    """Groq call skipped (breaker open) or out of time/retries - callers use their fallback."""
+
+
+class CircuitBreaker:
+    """Opens after `threshold` consecutive failures; then lets one probe through per `reset_after`."""
+
+    def __init__(self, threshold: int, reset_after: float):
+        self.threshold = threshold
+        self.reset_after = reset_after
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+
+    @property
+    def state(self) -> str:
+        return "closed" if self.opened_at is None else "open"
+
+    def allow(self) -> bool:
+        if self.opened_at is None:
+            return True
+        now = time.monotonic()
+        if now - self.opened_at >= self.reset_after:
+            self.opened_at = now  # half-open: this caller is the probe
+            return True
+        return False
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self.opened_at = None
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        if self.failures >= self.threshold:
+            if self.opened_at is None:
+                logger.warning(f"Groq circuit breaker opened after {self.failures} failures")
+            self.opened_at = time.monotonic()
+
+
+class CategorizeBatcher:
+    """Collects concurrent categorize requests for a short window and answers them with one prompt."""
+
+    def __init__(self, service: "AIService", window: float, max_size: int):
+        self.service = service
+        self.window = window
+        self.max_size = max_size
+        self.batches = 0
+        self.items = 0
+        self._pending: List[Tuple[float, str, asyncio.Future]] = []
+        self._timer: Optional[asyncio.Task] = None
+        self._running: set = set()  # the loop only holds weak references to tasks
+
+    async def submit(self, amount: float, remarks: str) -> str:
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((amount, remarks, future))
+        
+        if len(self._pending) >= self.max_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = asyncio.create_task(self._flush_after_window())
+        return await future
+
+    async def _flush_after_window(self) -> None:
+        await asyncio.sleep(self.window)
+        self._timer = None
+        self._flush()
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if batch:
+            task = asyncio.create_task(self._run(batch))
+            self._running.add(task)
+            task.add_done_callback(self._running.discard)
+
+    async def _run(self, batch: List[Tuple[float, str, asyncio.Future]]) -> None:
+        self.batches += 1
+        self.items += len(batch)
+        items = [(amount, remarks) for amount, remarks, _ in batch]
+        try:
+            categories = await self.service._categorize_items(items)
+        except Exception as e:
+            logger.error(f"AI batch categorization error: {e}")
+            categories = ["Other"] * len(batch)
+        
+        for (_, _, future), category in zip(batch, categories):
+            if not future.done():  # caller may have been cancelled
+                future.set_result(category)
+
 
 class AIService:
     def __init__(self):
         settings = get_settings()
-        self.client = Groq(api_key=settings.groq_api_key) if settings.groq_api_key else None
+        # Retries are ours (with jitter, inside the deadline), not the SDK's
+        self.client = (
+            AsyncGroq(
+                api_key=settings.groq_api_key,
+                max_retries=0,
+                http_client=get_http_client("groq"),
+            )
+            if settings.groq_api_key else None
+        )
         self.model = "llama-3.3-70b-versatile"
+        self.timeout = settings.ai_timeout_seconds
+        self.deadline = settings.ai_deadline_seconds
+        self.max_retries = settings.ai_max_retries
+        self.breaker = CircuitBreaker(settings.ai_breaker_threshold, settings.ai_breaker_reset_seconds)
+        self._slots = asyncio.Semaphore(settings.ai_max_concurrency)
+        self.batcher = CategorizeBatcher(
+            self,
+            window=settings.ai_batch_window_ms / 1000,
+            max_size=settings.ai_batch_max_size,
+        )
     
     @property
     def enabled(self) -> bool:
         return self.client is not None
     
+    async def _complete(self, prompt: str, temperature: float, max_tokens: int) -> str:
+        """One chat completion with bounded concurrency, a deadline, jittered retries and the breaker.
+        
+        Only upstream degradation feeds the breaker - timeouts, connection errors, 5xx and
+        429. A 4xx (bad request, auth) is raised as-is: one malformed prompt must not trip
+        the breaker for every user. Running out of deadline while queued for a local slot
+        is our own backlog, not Groq degrading.
+        """
+        if not self.breaker.allow():
+            raise AIUnavailable("circuit breaker open")
+        
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.deadline
+        attempt = 0
+        while True:
+            try:
+                async with asyncio.timeout_at(deadline):
+                    await self._slots.acquire()
+            except TimeoutError:
+                raise AIUnavailable("deadline reached waiting for a local AI slot") from None
+            
+            # Capped by what's left of the deadline; a cap below our own timeout isn't Groq's fault
+            attempt_timeout = min(self.timeout, deadline - loop.time())
+            try:
+                completion = await asyncio.wait_for(
+                    self.client.chat.completions.create(
+                        model=self.model,
+                        messages=[{"role": "user", "content": prompt}],
+                        temperature=temperature,
+                        max_tokens=max_tokens,
+                    ),
+                    timeout=attempt_timeout,
+                )
+            except asyncio.TimeoutError as e:
+                if attempt_timeout < self.timeout:
+                    raise AIUnavailable("deadline reached during the Groq call") from e
+                error = e
+            except RETRYABLE_ERRORS as e:
+                error = e
+            else:
+                self.breaker.record_success()
+                return completion.choices[0].message.content.strip()
+            finally:
+                self._slots.release()
+            
+            attempt += 1
+            backoff = min(2.0, 0.25 * 2 ** attempt) * random.uniform(0.5, 1.5)
+            if attempt > self.max_retries or loop.time() + backoff >= deadline:
+                self.breaker.record_failure()
+                raise AIUnavailable(f"Groq unavailable after {attempt} attempt(s): {error!r}") from error
+            await asyncio.sleep(backoff)
+    
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "breaker": self.breaker.state,
+            "consecutive_failures": self.breaker.failures,
+            "categorize_batches": self.batcher.batches,
+            "categorize_items": self.batcher.items,
+        }
+    
     async def categorize_transaction(self, amount: float, remarks: str) -> str:
         if not self.enabled:
             return "Other"
         
+        # Concurrent callers share one LLM request via the micro-batcher
+        return await self.batcher.submit(amount, remarks)
+    
+    async def _categorize_one(self, amount: float, remarks: str) -> str:
         try:
             prompt = f"""Given this transaction:
 Amount: {amount}
@@ -33,51 +246,81 @@ Categorize it into ONE of these categories: Food, Rent, Travel, Bills, Shopping,
 
 Respond with ONLY the category name, nothing else."""
             
-            completion = self.client.chat.completions.create(
-                model=self.model,
-                messages=[{"role": "user", "content": prompt}],
-                temperature=0.3,
-                max_tokens=20
-            )
-            
-            category = completion.choices[0].message.content.strip()
-            valid = ["Food", "Rent", "Travel", "Bills", "Shopping", "Savings", "Investment", "Other"]
-            
-            return category if category in valid else "Other"
+            category = await self._complete(prompt, temperature=0.3, max_tokens=20)
+            return category if category in VALID_CATEGORIES else "Other"
+        except AIUnavailable as e:
+            logger.warning(f"AI categorization skipped: {e}")
+            return "Other"
         except Exception as e:
             logger.error(f"AI categorization error: {e}")
             return "Other"
     
-    async def generate_monthly_insights(
+    async def _categorize_items(self, items: List[Tuple[float, str]]) -> List[str]:
+        """One numbered prompt for the whole batch; per-item calls if the reply can't be parsed."""
+        if len(items) == 1:
+            return [await self._categorize_one(*items[0])]
+        
+        listing = "\n".join(
+            f"{i}. Amount: {amount} | Remarks: {remarks}"
+            for i, (amount, remarks) in enumerate(items, start=1)
+        )
+        prompt = f"""Categorize each of these {len(items)} transactions:
+{listing}
+
+Categories: Food, Rent, Travel, Bills, Shopping, Savings, Investment, Other
+
+Respond with exactly {len(items)} lines in the form "<number>. <category>", nothing else."""
+        
+        try:
+            reply = await self._complete(prompt, temperature=0.3, max_tokens=8 * len(items) + 20)
+        except AIUnavailable as e:
+            logger.warning(f"AI categorization skipped: {e}")
+            return ["Other"] * len(items)
+        
+        categories = parse_numbered_reply(reply, len(items))
+        if categories is None:
+            logger.warning(f"Unparseable batch categorization reply, retrying {len(items)} items singly")
+            return list(await asyncio.gather(*(self._categorize_one(*item) for item in items)))
+        return categories
+    
+    async def categorize_transactions(self, items: List[Tuple[float, str]]) -> List[str]:
+        """Categorize many (amount, remarks) pairs, asking once per distinct remarks."""
+        unique = {}
+        for amount, remarks in items:
+            unique.setdefault(remarks.strip().lower(), (amount, remarks))
+        
+        keys = list(unique)
+        categories = await asyncio.gather(
+            *(self.categorize_transaction(*unique[key]) for key in keys)
+        )
+        by_key = dict(zip(keys, categories))
+        return [by_key[remarks.strip().lower()] for _, remarks in items]
+    
+    def _insights_prompt(
         self,
-        user_id: str,
         month: int,
         year: int,
         transactions: List[dict],
-        budget: Optional[float] = None,
-        currency: str = "USD"
+        budget: Optional[float],
+        currency: str,
     ) -> str:
-        if not self.enabled or not transactions:
-            return "No insights available."
-        
         # Currency symbols for display
         symbols = {"USD": "$", "EUR": "€", "GBP": "£", "INR": "₹", "JPY": "¥", 
                    "AUD": "A$", "CAD": "C$", "CHF": "CHF", "CNY": "¥"}
         sym = symbols.get(currency, currency)
         
-        try:
-            total_expense = sum(t["amount"] for t in transactions if t["category"] not in ["Savings", "Investment"])
-            total_savings = sum(t["amount"] for t in transactions if t["category"] == "Savings")
-            total_investment = sum(t["amount"] for t in transactions if t["category"] == "Investment")
-            
-            category_totals = defaultdict(float)
-            for t in transactions:
-                category_totals[t["category"]] += t["amount"]
-            
-            category_summary = "\n".join([f"- {cat}: {sym}{amt:.2f}" for cat, amt in category_totals.items()])
-            budget_info = f"Monthly budget: {sym}{budget}\n" if budget else ""
-            
-            prompt = f"""Analyze this monthly expense data and provide insights:
+        total_expense = sum(t["amount"] for t in transactions if t["category"] not in ["Savings", "Investment"])
+        total_savings = sum(t["amount"] for t in transactions if t["category"] == "Savings")
+        total_investment = sum(t["amount"] for t in transactions if t["category"] == "Investment")
+        
+        category_totals = defaultdict(float)
+        for t in transactions:
+            category_totals[t["category"]] += t["amount"]
+        
+        category_summary = "\n".join([f"- {cat}: {sym}{amt:.2f}" for cat, amt in category_totals.items()])
+        budget_info = f"Monthly budget: {sym}{budget}\n" if budget else ""
+        
+        return f"""Analyze this monthly expense data and provide insights:
 
 Month: {month}/{year}
 Currency: {currency} ({sym})
@@ -95,59 +338,114 @@ Provide:
 4. ONE blunt, actionable suggestion to improve finances
 
 Use the {sym} symbol for all amounts. Be direct and specific with numbers. Keep it under 150 words."""
-            
-            completion = self.client.chat.completions.create(
-                model=self.model,
-                messages=[{"role": "user", "content": prompt}],
-                temperature=0.7,
-                max_tokens=300
-            )
-            
-            return completion.choices[0].message.content.strip()
+    
+    async def generate_monthly_insights(
+        self,
+        user_id: str,
+        month: int,
+        year: int,
+        transactions: List[dict],
+        budget: Optional[float] = None,
+        currency: str = "USD"
+    ) -> str:
+        if not self.enabled or not transactions:
+            return "No insights available."
+        
+        try:
+            prompt = self._insights_prompt(month, year, transactions, budget, currency)
+            return await self._complete(prompt, temperature=0.7, max_tokens=300)
+        except AIUnavailable as e:
+            logger.warning(f"AI insights skipped: {e}")
+            return INSIGHTS_UNAVAILABLE
         except Exception as e:
             logger.error(f"AI insights generation error: {e}")
-            return "Unable to generate insights at this time."
+            return INSIGHTS_UNAVAILABLE
     
-    async def detect_spending_spike(
+    async def stream_monthly_insights(
         self,
-        current_month_transactions: List[dict],
-        previous_month_transactions: List[dict]
-    ) -> Optional[str]:
-        if not self.enabled:
+        month: int,
+        year: int,
+        transactions: List[dict],
+        budget: Optional[float] = None,
+        currency: str = "USD"
+    ) -> AsyncIterator[str]:
+        """Yield insight tokens as Groq produces them. Raises AIUnavailable/errors to the caller.
+        
+        Closing the generator early (client gone) closes the upstream response.
+        """
+        if not self.enabled or not transactions:
+            yield "No insights available."
+            return
+        
+        if not self.breaker.allow():
+            raise AIUnavailable("circuit breaker open")
+        
+        prompt = self._insights_prompt(month, year, transactions, budget, currency)
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.deadline
+        try:
+            async with asyncio.timeout_at(deadline):
+                await self._slots.acquire()
+        except TimeoutError:
+            raise AIUnavailable("deadline reached waiting for a local AI slot") from None
+        
+        # The deadline covers the whole stream, not just the first byte: a stalled
+        # upstream must not hold a slot indefinitely. Each await is bounded on its own,
+        # so the consumer's time between tokens isn't cut short mid-write.
+        stream = None
+        try:
+            try:
+                async with asyncio.timeout_at(min(deadline, loop.time() + self.timeout)):
+                    stream = await self.client.chat.completions.create(
+                        model=self.model,
+                        messages=[{"role": "user", "content": prompt}],
+                        temperature=0.7,
+                        max_tokens=300,
+                        stream=True,
+                    )
+                chunks = aiter(stream)
+                while True:
+                    async with asyncio.timeout_at(deadline):
+                        chunk = await anext(chunks, None)
+                    if chunk is None:
+                        break
+                    token = chunk.choices[0].delta.content if chunk.choices else None
+                    if token:
+                        yield token
+            except TimeoutError as e:
+                self.breaker.record_failure()
+                raise AIUnavailable("deadline reached during the Groq stream") from e
+            except RETRYABLE_ERRORS:
+                self.breaker.record_failure()
+                raise
+            self.breaker.record_success()
+        finally:
+            self._slots.release()
+            if stream is not None:
+                await stream.close()
+    
+    async def phrase_spending_alert(self, alerts: List[dict]) -> Optional[str]:
+        """Word an already-detected spike as a short warning. None if the LLM can't help."""
+        if not self.enabled or not alerts:
             return None
         
         try:
-            current_expenses = [t for t in current_month_transactions if t["category"] not in ["Savings", "Investment"]]
-            prev_expenses = [t for t in previous_month_transactions if t["category"] not in ["Savings", "Investment"]]
-            
-            if not prev_expenses:
-                return None
-            
-            current_total = sum(t["amount"] for t in current_expenses)
-            prev_total = sum(t["amount"] for t in prev_expenses)
-            
-            if current_total <= prev_total * 1.2:
-                return None
-            
-            increase_pct = ((current_total - prev_total) / prev_total) * 100
-            
-            prompt = f"""Spending increased by {increase_pct:.1f}% this month compared to last month.
-
-Current month total: {current_total:.2f}
-Previous month total: {prev_total:.2f}
+            lines = "\n".join(
+                f"- {a['category']}: {a['current']:.2f} this month vs usual {a['baseline']:.2f} "
+                f"({a['increase_pct']:.0f}% higher)"
+                for a in alerts
+            )
+            prompt = f"""These spending spikes were detected this month, compared with the user's recent monthly average:
+{lines}
 
 Generate a brief warning message (1-2 sentences) about this spike. Be direct and specific."""
             
-            completion = self.client.chat.completions.create(
-                model=self.model,
-                messages=[{"role": "user", "content": prompt}],
-                temperature=0.7,
-                max_tokens=100
-            )
-            
-            return completion.choices[0].message.content.strip()
+            return await self._complete(prompt, temperature=0.7, max_tokens=100)
+        except AIUnavailable as e:
+            logger.warning(f"Spike warning skipped: {e}")
+            return None
         except Exception as e:
-            logger.error(f"Spike detection error: {e}")
+            logger.error(f"Spike phrasing error: {e}")
             return None
 
 
@@ -0,0 +1,206 @@
+# Cached transaction categorization in front of the LLM
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import event, select, tuple_
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from ..core.cache import TTLCache
+from ..core.config import get_settings
+from ..models.category import CategoryCache, CategoryOverride
+from .ai import get_ai_service
+from .classifier import amount_bucket, get_classifier, normalize_remarks
+
+
+class Categorizer:
+    """Lookup order: user override -> in-process LRU -> category_cache table -> local model -> LLM."""
+
+    def __init__(self):
+        settings = get_settings()
+        self.memory = TTLCache(
+            maxsize=settings.category_cache_size,
+            ttl=settings.category_cache_ttl_seconds,
+        )
+        self.counts = {"override": 0, "memory": 0, "table": 0, "local": 0, "llm": 0}
+
+    async def _overrides(self, db: AsyncSession, user_id: str) -> Dict[str, str]:
+        key = ("overrides", user_id)
+        overrides = self.memory.get(key)
+        if overrides is None:
+            result = await db.execute(
+                select(CategoryOverride.remarks_key, CategoryOverride.category)
+                .where(CategoryOverride.user_id == user_id)
+            )
+            overrides = dict(result.all())
+            self.memory.set(key, overrides)
+        return overrides
+
+    async def _from_table(self, db: AsyncSession, keys: List[Tuple[str, int]]) -> Dict[Tuple[str, int], str]:
+        result = await db.execute(
+            select(CategoryCache.remarks_key, CategoryCache.amount_bucket, CategoryCache.category)
+            .where(tuple_(CategoryCache.remarks_key, CategoryCache.amount_bucket).in_(keys))
+        )
+        found = {(k, b): c for k, b, c in result.all()}
+        for key, category in found.items():
+            self.memory.set(("global", *key), category)
+        return found
+
+    async def _remember(self, db: AsyncSession, entries: List[Tuple[str, int, str]]) -> None:
+        # "Other" is also the LLM failure fallback, so it is never cached
+        rows = {
+            (remarks_key, bucket): category
+            for remarks_key, bucket, category in entries
+            if category != "Other"
+        }
+        if not rows:
+            return
+
+        for (remarks_key, bucket), category in rows.items():
+            self.memory.set(("global", remarks_key, bucket), category)
+
+        stmt = insert(CategoryCache)
+        await db.execute(
+            stmt.on_conflict_do_update(
+                index_elements=[CategoryCache.remarks_key, CategoryCache.amount_bucket],
+                set_={"category": stmt.excluded.category, "updated_at": stmt.excluded.updated_at},
+            ),
+            [
+                {"remarks_key": k, "amount_bucket": b, "category": c}
+                for (k, b), c in rows.items()
+            ],
+        )
+
+    async def categorize(self, db: AsyncSession, user_id: str, amount: float, remarks: str) -> str:
+        results = await self.categorize_many(db, user_id, [(amount, remarks)])
+        return results[0]
+
+    async def categorize_many(
+        self, db: AsyncSession, user_id: str, items: List[Tuple[float, str]]
+    ) -> List[str]:
+        """Categorize (amount, remarks) pairs; only cache misses go to the LLM, as one group."""
+        overrides = await self._overrides(db, user_id)
+        results: List[Optional[str]] = [None] * len(items)
+        pending: Dict[tuple, List[int]] = {}
+
+        for i, (amount, remarks) in enumerate(items):
+            remarks_key, bucket = normalize_remarks(remarks), amount_bucket(amount)
+            if not remarks_key:
+                # Nothing cacheable left after normalizing (e.g. only digits) - ask as-is
+                pending[(None, i)] = [i]
+            elif remarks_key in overrides:
+                self.counts["override"] += 1
+                results[i] = overrides[remarks_key]
+            else:
+                category = self.memory.get(("global", remarks_key, bucket))
+                if category is not None:
+                    self.counts["memory"] += 1
+                    results[i] = category
+                else:
+                    pending.setdefault((remarks_key, bucket), []).append(i)
+
+        cacheable = [key for key in pending if key[0] is not None]
+        if cacheable:
+            for key, category in (await self._from_table(db, cacheable)).items():
+                for i in pending.pop(key):
+                    self.counts["table"] += 1
+                    results[i] = category
+
+        # Confident local predictions skip the LLM; they aren't cached, the model already knows them
+        classifier = get_classifier()
+        for key in [key for key in pending if key[0] is not None]:
+            category = await classifier.predict(db, user_id, *key)
+            if category is not None:
+                for i in pending.pop(key):
+                    self.counts["local"] += 1
+                    results[i] = category
+
+        if pending:
+            self.counts["llm"] += sum(len(indexes) for indexes in pending.values())
+            suggested = await get_ai_service().categorize_transactions(
+                [items[indexes[0]] for indexes in pending.values()]
+            )
+            for indexes, category in zip(pending.values(), suggested):
+                for i in indexes:
+                    results[i] = category
+            await self._remember(
+                db,
+                [(k, b, c) for (k, b), c in zip(pending, suggested) if k is not None],
+            )
+
+        return results
+
+    async def record_label(
+        self,
+        db: AsyncSession,
+        user_id: str,
+        amount: float,
+        remarks: Optional[str],
+        category: Optional[str],
+    ) -> None:
+        """A category the user picked explicitly: store an override and train the local model.
+        
+        The in-process side (model, cached overrides) only changes once the session commits.
+        """
+        if not remarks or not category or category == "Other":
+            return
+        remarks_key = normalize_remarks(remarks)
+        if not remarks_key:
+            return
+
+        db.info.setdefault("learned_labels", []).append(
+            (user_id, remarks_key, amount_bucket(amount), category)
+        )
+
+        overrides = await self._overrides(db, user_id)
+        if overrides.get(remarks_key) == category:
+            return
+
+        stmt = insert(CategoryOverride).values(
+            user_id=user_id, remarks_key=remarks_key, category=category
+        )
+        await db.execute(
+            stmt.on_conflict_do_update(
+                index_elements=[CategoryOverride.user_id, CategoryOverride.remarks_key],
+                set_={"category": stmt.excluded.category, "updated_at": stmt.excluded.updated_at},
+            )
+        )
+
+    def apply_labels(self, labels) -> None:
+        classifier = get_classifier()
+        for user_id, remarks_key, bucket, category in labels:
+            classifier.learn(user_id, remarks_key, bucket, category)
+            # Reloaded on next use, now including the committed override
+            self.memory.pop(("overrides", user_id))
+
+    def stats(self) -> dict:
+        lookups = sum(self.counts.values())
+        served = lookups - self.counts["llm"]
+        return {
+            **self.counts,
+            "hit_rate": round(served / lookups, 4) if lookups else 0.0,
+            "lru": self.memory.stats(),
+        }
+
+
+_categorizer: Optional[Categorizer] = None
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_learned_labels(session: Session) -> None:
+    labels = session.info.pop("learned_labels", ())
+    if labels:
+        get_categorizer().apply_labels(labels)
+
+
+@event.listens_for(Session, "after_rollback")
+def _drop_learned_labels(session: Session) -> None:
+    # A request that failed validation (or its commit) must not train on data never stored
+    session.info.pop("learned_labels", None)
+
+
+def get_categorizer() -> Categorizer:
+    global _categorizer
+    if _categorizer is None:
+        _categorizer = Categorizer()
+    return _categorizer
@@ -0,0 +1,207 @@
+# Local naive Bayes categorizer - answers confident cases without calling the LLM
+import asyncio
+import logging
+import math
+import re
+from collections import Counter, defaultdict
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..core.cache import TTLCache
+from ..core.config import get_settings
+from ..core.database import session_factory
+from ..models.transaction import Transaction
+
+logger = logging.getLogger(__name__)
+
+CATEGORIES = ("Food", "Rent", "Travel", "Bills", "Shopping", "Savings", "Investment")
+
+_NON_WORD = re.compile(r"[^a-z]+")
+
+
+def normalize_remarks(remarks: str) -> str:
+    """'UBER *Trip 8841' -> 'uber trip' - digits, punctuation and case don't change the merchant."""
+    return " ".join(_NON_WORD.sub(" ", remarks.lower()).split())
+
+
+def amount_bucket(amount: float) -> int:
+    """Power-of-two bucket, so 'rent' at 12 and at 1200 can resolve differently."""
+    return int(math.log2(abs(amount) + 1))
+
+
+def features(normalized_remarks: str, bucket: int) -> List[str]:
+    """Word tokens, padded character trigrams (typo/variant tolerant) and the amount bucket."""
+    feats = [f"amt:{bucket}"]
+    for word in normalized_remarks.split():
+        feats.append(f"w:{word}")
+        padded = f"^{word}$"
+        feats.extend(f"c:{padded[i:i + 3]}" for i in range(len(padded) - 2))
+    return feats
+
+
+class NaiveBayesModel:
+    """Multinomial naive Bayes counts, updated one example at a time."""
+
+    def __init__(self):
+        self.examples = 0
+        self.class_counts: Counter = Counter()
+        self.feature_totals: Counter = Counter()
+        self.feature_counts: Dict[str, Counter] = defaultdict(Counter)
+        self.vocabulary: set = set()
+
+    def learn(self, feats: List[str], category: str) -> None:
+        self.examples += 1
+        self.class_counts[category] += 1
+        self.feature_totals[category] += len(feats)
+        self.feature_counts[category].update(feats)
+        self.vocabulary.update(feats)
+
+
+def predict(
+    feats: List[str],
+    global_model: NaiveBayesModel,
+    user_model: Optional[NaiveBayesModel],
+    user_weight: float,
+    alpha: float = 1.0,
+) -> Tuple[Optional[str], float]:
+    """(category, posterior) from global counts blended with the user's, weighted up."""
+    models = [(global_model, 1.0)]
+    if user_model is not None and user_model.examples:
+        models.append((user_model, user_weight))
+
+    total_examples = sum(m.examples * w for m, w in models)
+    if not total_examples:
+        return None, 0.0
+
+    # Naive Bayes is overconfident on merchants it has never seen - require a known word
+    words = [feat for feat in feats if feat.startswith("w:")]
+    if not any(word in m.vocabulary for m, _ in models for word in words):
+        return None, 0.0
+
+    # Upper bound on the merged vocabulary; exact union would cost O(V) per call
+    vocab_size = sum(len(m.vocabulary) for m, _ in models)
+    log_scores = {}
+    for category in CATEGORIES:
+        prior = sum(m.class_counts[category] * w for m, w in models)
+        if not prior:
+            continue
+        denominator = sum(m.feature_totals[category] * w for m, w in models) + alpha * vocab_size
+        score = math.log(prior / total_examples)
+        for feat in feats:
+            count = sum(m.feature_counts[category][feat] * w for m, w in models)
+            score += math.log((count + alpha) / denominator)
+        log_scores[category] = score
+
+    if not log_scores:
+        return None, 0.0
+
+    # Softmax over log scores for a calibrated-enough confidence
+    best = max(log_scores, key=log_scores.get)
+    top = log_scores[best]
+    norm = sum(math.exp(s - top) for s in log_scores.values())
+    return best, 1.0 / norm
+
+
+class LocalClassifier:
+    """A global model plus per-user models, trained from labelled transactions."""
+
+    def __init__(self):
+        settings = get_settings()
+        self.min_confidence = settings.classifier_min_confidence
+        self.min_examples = settings.classifier_min_examples
+        self.user_weight = settings.classifier_user_weight
+        self.global_model = NaiveBayesModel()
+        self.user_models = TTLCache(maxsize=settings.classifier_user_models, ttl=24 * 3600)
+        self._warmup: Optional[asyncio.Task] = None
+
+    async def _labelled(self, db: AsyncSession, user_id: Optional[str], limit: int):
+        query = (
+            select(Transaction.remarks, Transaction.amount, Transaction.category)
+            .where(
+                Transaction.remarks.is_not(None),
+                Transaction.category.in_(CATEGORIES),
+            )
+            .order_by(Transaction.created_at.desc())
+            .limit(limit)
+        )
+        if user_id:
+            query = query.where(Transaction.user_id == user_id)
+        return (await db.execute(query)).all()
+
+    async def train_global(self) -> None:
+        factory = session_factory()
+        async with factory() as db:
+            rows = await self._labelled(db, None, get_settings().classifier_global_examples)
+
+        model = NaiveBayesModel()
+        for remarks, amount, category in rows:
+            key = normalize_remarks(remarks)
+            if key:
+                model.learn(features(key, amount_bucket(amount)), category)
+        self.global_model = model
+        logger.info(f"Local categorizer trained on {model.examples} labelled transactions")
+
+    def start(self) -> None:
+        """Train the global model in the background so startup isn't held up."""
+        async def warmup():
+            try:
+                await self.train_global()
+            except Exception as e:
+                logger.warning(f"Local categorizer training failed: {e}")
+
+        self._warmup = asyncio.create_task(warmup())
+
+    async def stop(self) -> None:
+        """Cancel warmup training that is still running at shutdown."""
+        if self._warmup:
+            self._warmup.cancel()
+            try:
+                await self._warmup
+            except asyncio.CancelledError:
+                pass
+            self._warmup = None
+
+    async def _user_model(self, db: AsyncSession, user_id: str) -> NaiveBayesModel:
+        model = self.user_models.get(user_id)
+        if model is None:
+            model = NaiveBayesModel()
+            for remarks, amount, category in await self._labelled(db, user_id, 2000):
+                key = normalize_remarks(remarks)
+                if key:
+                    model.learn(features(key, amount_bucket(amount)), category)
+            self.user_models.set(user_id, model)
+        return model
+
+    async def predict(
+        self, db: AsyncSession, user_id: str, remarks_key: str, bucket: int
+    ) -> Optional[str]:
+        """A category if the blended model is confident enough, else None (ask the LLM)."""
+        user_model = await self._user_model(db, user_id)
+        if self.global_model.examples + user_model.examples < self.min_examples:
+            return None
+
+        category, confidence = predict(
+            features(remarks_key, bucket), self.global_model, user_model, self.user_weight
+        )
+        return category if confidence >= self.min_confidence else None
+
+    def learn(self, user_id: str, remarks_key: str, bucket: int, category: str) -> None:
+        if category not in CATEGORIES:
+            return
+        feats = features(remarks_key, bucket)
+        self.global_model.learn(feats, category)
+        user_model = self.user_models.get(user_id)
+        if user_model is not None:
+            user_model.learn(feats, category)
+
+
+_classifier: Optional[LocalClassifier] = None
+
+
+def get_classifier() -> LocalClassifier:
+    global _classifier
+    if _classifier is None:
+        _classifier = LocalClassifier()
+    return _classifier
@@ -1,9 +1,19 @@
 # Currency exchange rate service
 import httpx
 import logging
-from datetime import datetime, timezone
+import time
+from datetime import date, datetime, timezone
+from typing import Dict, Iterable, Optional, Tuple
 
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..core.cache import SingleFlight, TTLCache
 from ..core.config import get_settings
+from ..core.database import session_factory
+from ..core.http import get_http_client
+from ..models.currency import FxRate
 
 
 logger = logging.getLogger(__name__)
@@ -14,16 +24,14 @@ class CurrencyService:
 
     def __init__(self):
         self.settings = get_settings()
-        self.client = httpx.AsyncClient(
-            timeout=30.0,
-            headers={"User-Agent": "urWallet/1.0"}
-        )
+        # Shared keep-alive client; closed by the app lifespan, not per request
+        self.client = get_http_client("fx")
 
     async def __aenter__(self):
         return self
 
     async def __aexit__(self, exc_type, exc_val, exc_tb):
-        await self.client.aclose()
+        pass
 
     async def fetch_rates(self, base_currency: str = "USD") -> dict | None:
         """
@@ -53,10 +61,18 @@ class CurrencyService:
                 return None
 
             logger.info(f"Fetched {len(data['conversion_rates'])} currency rates")
-            return {
+            fetched_at = datetime.now(timezone.utc)
+            last_update = data.get("time_last_update_unix")
+            rates_data = {
                 "base_currency": base_currency.upper(),
                 "rates": data["conversion_rates"],
-                "fetched_at": datetime.now(timezone.utc)
+                "date": (
+                    datetime.fromtimestamp(last_update, timezone.utc).date()
+                    if last_update else fetched_at.date()
+                ),
+                "fetched_at": fetched_at,
+                "next_update_unix": data.get("time_next_update_unix"),
+                "source": "live",
             }
 
         except httpx.TimeoutException:
@@ -65,27 +81,183 @@ class CurrencyService:
             logger.error(f"HTTP error fetching rates: {e.response.status_code}")
         except Exception as e:
             logger.error(f"Unexpected error fetching rates: {e}")
+        else:
+            await self.store_snapshot(rates_data)
+            return rates_data
 
         return None
 
-    async def get_rate(self, from_currency: str, to_currency: str) -> float | None:
-        """Get conversion rate from one currency to another."""
-        rates_data = await self.fetch_rates(base_currency=from_currency)
-        if not rates_data:
-            return None
+    async def store_snapshot(self, rates_data: dict) -> None:
+        """Keep the day's table in fx_rates for historical conversions and offline fallback."""
+        try:
+            factory = session_factory()
+            async with factory() as db:
+                stmt = insert(FxRate).values(
+                    base=rates_data["base_currency"],
+                    date=rates_data["date"],
+                    rates=rates_data["rates"],
+                    fetched_at=rates_data["fetched_at"].replace(tzinfo=None),
+                )
+                await db.execute(
+                    stmt.on_conflict_do_update(
+                        index_elements=[FxRate.base, FxRate.date],
+                        set_={"rates": stmt.excluded.rates, "fetched_at": stmt.excluded.fetched_at},
+                    )
+                )
+                await db.commit()
+        except Exception as e:
+            logger.warning(f"Failed to store FX snapshot: {e}")
+
+
+async def load_snapshot(
+    db: AsyncSession, base_currency: str, as_of: Optional[date] = None
+) -> Optional[dict]:
+    """The stored table for `base_currency` on or before `as_of` (latest if None)."""
+    query = select(FxRate).where(FxRate.base == base_currency.upper())
+    if as_of is not None:
+        query = query.where(FxRate.date <= as_of)
+    snapshot = (
+        await db.execute(query.order_by(FxRate.date.desc()).limit(1))
+    ).scalar_one_or_none()
+    if snapshot is None:
+        return None
+    
+    return {
+        "base_currency": snapshot.base,
+        "rates": snapshot.rates,
+        "date": snapshot.date,
+        "fetched_at": snapshot.fetched_at.replace(tzinfo=timezone.utc),
+        "source": "stored",
+    }
+
+
+# After a failed refresh, keep serving what we have and retry upstream after this long
+FAILED_REFRESH_BACKOFF_SECONDS = 60
+
+
+class RateCache:
+    """One base-currency rate table per process; every pair is derived from it.
+    
+    1 FROM = rates[TO] / rates[FROM] units of TO, so EUR->JPY needs no EUR table.
+    Refreshes are single-flight and only happen once the table expires. Past dates
+    are served from fx_rates snapshots, which are immutable and cached as well.
+    """
+
+    def __init__(self):
+        settings = get_settings()
+        self.base = settings.fx_base_currency.upper()
+        self.ttl = settings.fx_cache_ttl_seconds
+        self._table: Optional[dict] = None
+        self._expires_at = 0.0
+        self._flight = SingleFlight()
+        self._history = TTLCache(maxsize=366, ttl=24 * 3600)
+        self.refreshes = 0
+        self.failures = 0
+
+    async def _refresh(self) -> Optional[dict]:
+        async with CurrencyService() as service:
+            table = await service.fetch_rates(base_currency=self.base)
+        
+        if table is None:
+            self.failures += 1
+            self._expires_at = time.monotonic() + FAILED_REFRESH_BACKOFF_SECONDS
+            if self._table is None:
+                # Nothing in memory yet (fresh process, upstream down) - use the last stored day
+                try:
+                    factory = session_factory()
+                    async with factory() as db:
+                        self._table = await load_snapshot(db, self.base)
+                except Exception as e:
+                    logger.error(f"Failed to load stored FX snapshot: {e}")
+            return self._table
+        
+        # Expire when the provider publishes its next update, capped by our own TTL
+        ttl = self.ttl
+        if table.get("next_update_unix"):
+            ttl = min(ttl, max(table["next_update_unix"] - time.time(), FAILED_REFRESH_BACKOFF_SECONDS))
+        
+        self.refreshes += 1
+        self._table = table
+        self._expires_at = time.monotonic() + ttl
+        return table
+
+    async def _historical(self, as_of: date) -> Optional[dict]:
+        table = self._history.get(as_of)
+        if table is None:
+            factory = session_factory()
+            async with factory() as db:
+                table = await load_snapshot(db, self.base, as_of)
+            # {} remembers "no snapshot that old" so dashboards don't re-query every time
+            table = table or {}
+            self._history.set(as_of, table)
+        return table or None
+
+    async def table(self, as_of: Optional[date] = None) -> Optional[dict]:
+        """The latest table, or the stored one in effect on `as_of`."""
+        if as_of is not None and as_of < datetime.now(timezone.utc).date():
+            return await self._historical(as_of)
+        if time.monotonic() < self._expires_at:
+            return self._table
+        return await self._flight.do("latest", self._refresh)
+
+    async def snapshot_version(self, as_of: Optional[date] = None) -> str:
+        """Identifies the table factors(as_of=...) would use, for ETags. Never calls upstream.
+        
+        An expired latest table gets a distinct tag, so the next full response (which
+        refreshes it) isn't short-circuited by a 304.
+        """
+        if as_of is not None and as_of < datetime.now(timezone.utc).date():
+            table = await self._historical(as_of)
+            if table:
+                return f"{table['base_currency']}:{table['date'].isoformat()}"
+        
+        tag = self._table["fetched_at"].isoformat() if self._table else ""
+        return tag if time.monotonic() < self._expires_at else f"expired:{tag}"
 
-        to_currency = to_currency.upper()
-        if to_currency not in rates_data["rates"]:
-            logger.error(f"Currency {to_currency} not found in rates")
+    async def rates_for(self, base_currency: str, as_of: Optional[date] = None) -> Optional[dict]:
+        """Rates from `base_currency` to every currency the provider lists."""
+        table = await self.table(as_of)
+        base_currency = base_currency.upper()
+        if not table or base_currency not in table["rates"]:
             return None
+        
+        base_rate = table["rates"][base_currency]
+        return {
+            "base_currency": base_currency,
+            "rates": {code: rate / base_rate for code, rate in table["rates"].items()},
+            "date": table["date"],
+            "fetched_at": table["fetched_at"],
+            "source": table["source"],
+        }
+
+    @staticmethod
+    def cross_rate(table: dict, from_currency: str, to_currency: str) -> float | None:
+        rates = table["rates"]
+        from_currency, to_currency = from_currency.upper(), to_currency.upper()
+        for code in (from_currency, to_currency):
+            if code not in rates:
+                logger.error(f"Currency {code} not found in rates")
+                return None
+        
+        return rates[to_currency] / rates[from_currency]
 
-        return rates_data["rates"][to_currency]
+    async def get_rate(
+        self, from_currency: str, to_currency: str, as_of: Optional[date] = None
+    ) -> float | None:
+        """Get conversion rate from one currency to another."""
+        table = await self.table(as_of)
+        if not table:
+            return None
+        return self.cross_rate(table, from_currency, to_currency)
 
     async def convert(
-        self, amount: float, from_currency: str, to_currency: str
+        self, amount: float, from_currency: str, to_currency: str, as_of: Optional[date] = None
     ) -> dict | None:
         """Convert amount from one currency to another."""
-        rate = await self.get_rate(from_currency, to_currency)
+        table = await self.table(as_of)
+        if not table:
+            return None
+        rate = self.cross_rate(table, from_currency, to_currency)
         if rate is None:
             return None
 
@@ -96,5 +268,58 @@ class CurrencyService:
             "to_currency": to_currency.upper(),
             "rate": rate,
             "converted_amount": converted,
-            "fetched_at": datetime.now(timezone.utc).isoformat()
+            "rates_date": table["date"].isoformat(),
+            "source": table["source"],
+            "fetched_at": table["fetched_at"].isoformat()
         }
+
+    async def factors(
+        self, currencies: Iterable[str], target: str, as_of: Optional[date] = None
+    ) -> Tuple[Dict[str, float], Optional[dict]]:
+        """One multiplier per distinct currency into `target`, and the snapshot they came from.
+        
+        Falls back to the latest table when there's no snapshot for `as_of`. Currencies
+        that can't be resolved are left out; callers keep those amounts unconverted.
+        """
+        target = target.upper()
+        currencies = {c for c in currencies if c}
+        factors = {c: 1.0 for c in currencies if c.upper() == target}
+        if len(factors) == len(currencies):
+            return factors, None
+        
+        table = await self.table(as_of) or await self.table()
+        if not table:
+            return factors, None
+        
+        for code in currencies - factors.keys():
+            rate = self.cross_rate(table, code, target)
+            if rate is not None:
+                factors[code] = rate
+        return factors, {
+            "base_currency": table["base_currency"],
+            "rates_date": table["date"].isoformat(),
+            "source": table["source"],
+            "fetched_at": table["fetched_at"].isoformat(),
+        }
+
+    def stats(self) -> dict:
+        return {
+            "base_currency": self.base,
+            "loaded": self._table is not None,
+            "rates_date": self._table["date"].isoformat() if self._table else None,
+            "source": self._table["source"] if self._table else None,
+            "expires_in": round(max(self._expires_at - time.monotonic(), 0.0), 1),
+            "refreshes": self.refreshes,
+            "failures": self.failures,
+            "history": self._history.stats(),
+        }
+
+
+_rate_cache: Optional[RateCache] = None
+
+
+def get_rate_cache() -> RateCache:
+    global _rate_cache
+    if _rate_cache is None:
+        _rate_cache = RateCache()
+    return _rate_cache
@@ -0,0 +1,253 @@
+# Monthly AI insights, cached per month and refreshed when the month's data changes
+import hashlib
+import logging
+from contextlib import aclosing
+from datetime import date, datetime, timedelta
+from typing import AsyncIterator, List, Optional, Tuple
+
+from sqlalchemy import distinct, func, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..core.cache import SingleFlight
+from ..core.database import session_factory
+from ..core.dates import month_range
+from ..models.transaction import MonthlySummary, Transaction
+from .ai import INSIGHTS_UNAVAILABLE, get_ai_service
+from .currency import get_rate_cache
+
+logger = logging.getLogger(__name__)
+
+# Keyed by (user_id, year, month)
+_flights = SingleFlight()
+
+
+def _in_month(user_id: str, year: int, month: int) -> tuple:
+    start, end = month_range(year, month)
+    return (
+        Transaction.user_id == user_id,
+        Transaction.date >= start,
+        Transaction.date < end,
+    )
+
+
+def _rates_as_of(year: int, month: int) -> date:
+    # Month-end rates, as the dashboard uses
+    _, end = month_range(year, month)
+    return end - timedelta(days=1)
+
+
+async def _month_transactions(
+    db: AsyncSession, user_id: str, year: int, month: int, currency: str
+) -> Tuple[List[dict], Optional[str]]:
+    """The month's transactions with amounts converted to `currency` (one rate per currency),
+    and the date of the rate snapshot used (None when nothing needed converting).
+    """
+    result = await db.execute(select(Transaction).where(*_in_month(user_id, year, month)))
+    rows = result.scalars().all()
+    
+    factors, fx = await get_rate_cache().factors(
+        {t.currency for t in rows}, currency, as_of=_rates_as_of(year, month)
+    )
+    transactions = []
+    for t in rows:
+        row = t.to_dict()
+        # Unresolvable currencies stay as-is rather than dropping the row
+        if t.currency in factors:
+            row["amount"] = t.amount * factors[t.currency]
+            row["currency"] = currency
+        transactions.append(row)
+    return transactions, fx["rates_date"] if fx else None
+
+
+async def month_fingerprint(
+    db: AsyncSession,
+    user_id: str,
+    year: int,
+    month: int,
+    budget: Optional[float],
+    currency: str,
+) -> Tuple[Optional[str], Optional[str]]:
+    """Digest of the month's transaction set (count, sum, last change) and the inputs insights use,
+    and the rate snapshot date the month converts at.
+    
+    The snapshot is part of the digest, including which currencies it can't convert: insights
+    written while FX was unavailable go stale once rates are back. None when the month has
+    no transactions.
+    """
+    count, total, last_change, currencies = (
+        await db.execute(
+            select(
+                func.count(),
+                func.sum(Transaction.amount),
+                func.max(Transaction.updated_at),
+                func.array_agg(distinct(Transaction.currency)),
+            )
+            .where(*_in_month(user_id, year, month))
+        )
+    ).one()
+    if not count:
+        return None, None
+    
+    currencies = {c for c in currencies if c}
+    factors, fx = await get_rate_cache().factors(currencies, currency, as_of=_rates_as_of(year, month))
+    rates_date = fx["rates_date"] if fx else None
+    unconverted = ",".join(sorted(currencies - factors.keys()))
+    
+    raw = f"{count}|{total:.4f}|{last_change.isoformat()}|{budget}|{currency}|{rates_date}|{unconverted}"
+    return hashlib.sha1(raw.encode()).hexdigest(), rates_date
+
+
+async def get_summary(db: AsyncSession, user_id: str, year: int, month: int) -> Optional[MonthlySummary]:
+    result = await db.execute(
+        select(MonthlySummary)
+        .where(
+            MonthlySummary.user_id == user_id,
+            MonthlySummary.month == month,
+            MonthlySummary.year == year,
+        )
+    )
+    return result.scalar_one_or_none()
+
+
+async def _generate(
+    user_id: str,
+    year: int,
+    month: int,
+    budget: Optional[float],
+    currency: str,
+    fingerprint: str,
+) -> str:
+    # Own sessions: the flight is shared, so it can't borrow any one caller's request session
+    factory = session_factory()
+    async with factory() as db:
+        transactions, rates_date = await _month_transactions(db, user_id, year, month, currency)
+    
+    insights = await get_ai_service().generate_monthly_insights(
+        user_id=user_id,
+        month=month,
+        year=year,
+        transactions=transactions,
+        budget=budget,
+        currency=currency,
+    )
+    if insights != INSIGHTS_UNAVAILABLE:
+        async with factory() as db:
+            await store_insights(db, user_id, year, month, insights, fingerprint, rates_date)
+            await db.commit()
+    return insights
+
+
+async def generate_insights(
+    user_id: str,
+    year: int,
+    month: int,
+    budget: Optional[float],
+    currency: str,
+    fingerprint: str,
+) -> str:
+    """Call the LLM for the month and store the result with its fingerprint.
+    
+    Concurrent calls for the same month (two devices, client retries) share one LLM call.
+    """
+    return await _flights.do(
+        (user_id, year, month),
+        lambda: _generate(user_id, year, month, budget, currency, fingerprint),
+    )
+
+
+async def store_insights(
+    db: AsyncSession,
+    user_id: str,
+    year: int,
+    month: int,
+    insights: str,
+    fingerprint: str,
+    rates_date: Optional[str],
+) -> None:
+    """Upsert on (user_id, year, month) - a month never has more than one summary row."""
+    stmt = insert(MonthlySummary).values(
+        user_id=user_id,
+        month=month,
+        year=year,
+        ai_insights=insights,
+        fingerprint=fingerprint,
+        rates_date=rates_date,
+        last_generated=datetime.utcnow(),
+    )
+    await db.execute(
+        stmt.on_conflict_do_update(
+            index_elements=[MonthlySummary.user_id, MonthlySummary.year, MonthlySummary.month],
+            set_={
+                "ai_insights": stmt.excluded.ai_insights,
+                "fingerprint": stmt.excluded.fingerprint,
+                "rates_date": stmt.excluded.rates_date,
+                "last_generated": stmt.excluded.last_generated,
+            },
+        )
+    )
+
+
+async def stream_insights(
+    user_id: str,
+    year: int,
+    month: int,
+    budget: Optional[float],
+    currency: str,
+    fingerprint: str,
+) -> AsyncIterator[str]:
+    """Yield insight tokens as they arrive, then store the full text.
+    
+    Uses its own sessions - the response outlives the request-scoped one. If the
+    consumer stops early, the LLM stream is closed and nothing is stored.
+    
+    Shares the (user, year, month) flight with generate_insights: while this month is
+    already being generated, the result arrives as one chunk instead of a second LLM call.
+    If this stream fails or is dropped, callers waiting on it run their own generation.
+    """
+    leader = _flights.lead((user_id, year, month))
+    if leader is None:
+        yield await generate_insights(user_id, year, month, budget, currency, fingerprint)
+        return
+    
+    try:
+        factory = session_factory()
+        async with factory() as db:
+            transactions, rates_date = await _month_transactions(db, user_id, year, month, currency)
+        
+        parts = []
+        stream = get_ai_service().stream_monthly_insights(
+            month=month, year=year, transactions=transactions, budget=budget, currency=currency
+        )
+        async with aclosing(stream):
+            async for token in stream:
+                parts.append(token)
+                yield token
+        
+        text = "".join(parts).strip()
+        if text:
+            async with factory() as db:
+                await store_insights(db, user_id, year, month, text, fingerprint, rates_date)
+                await db.commit()
+        leader.set_result(text or INSIGHTS_UNAVAILABLE)
+    finally:
+        # One client dropping its stream is no reason to fail everyone else's request
+        _flights.abandon(leader)
+
+
+async def refresh_insights(
+    user_id: str,
+    year: int,
+    month: int,
+    budget: Optional[float],
+    currency: str,
+    fingerprint: str,
+) -> None:
+    """Background regeneration of stale insights; a no-op if one is already in flight."""
+    if (user_id, year, month) in _flights:
+        return
+    
+    try:
+        await generate_insights(user_id, year, month, budget, currency, fingerprint)
+    except Exception as e:
+        logger.error(f"Background insights refresh failed: {e}")
@@ -0,0 +1,157 @@
+# Incremental monthly rollups of transaction totals
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import Integer, cast, delete, extract, func, literal_column, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..models.transaction import MonthlyRollup, Transaction
+
+# (year, month, type, category, source, currency)
+RollupKey = Tuple[int, int, str, str, str, str]
+RollupDeltas = Dict[RollupKey, List[float]]  # key -> [total, count]
+
+
+def new_deltas() -> RollupDeltas:
+    return defaultdict(lambda: [0.0, 0])
+
+
+def rollup_key(txn: Transaction) -> RollupKey:
+    return (
+        txn.date.year,
+        txn.date.month,
+        txn.type or "expense",
+        txn.category,
+        txn.source or "",
+        txn.currency,
+    )
+
+
+def rollup_key_from_row(row: dict) -> RollupKey:
+    """Same as rollup_key() for a plain column dict (bulk inserts)."""
+    return (
+        row["date"].year,
+        row["date"].month,
+        row["type"] or "expense",
+        row["category"],
+        row["source"] or "",
+        row["currency"],
+    )
+
+
+def add_delta(deltas: RollupDeltas, key: RollupKey, amount: float, sign: int) -> None:
+    entry = deltas[key]
+    entry[0] += sign * amount
+    entry[1] += sign
+
+
+async def apply_rollup_deltas(db: AsyncSession, user_id: str, deltas: RollupDeltas) -> None:
+    """Upsert the deltas in the caller's transaction; drops rollups that reach zero rows."""
+    rows = [
+        {
+            "user_id": user_id,
+            "year": year,
+            "month": month,
+            "type": txn_type,
+            "category": category,
+            "source": source,
+            "currency": currency,
+            "total": total,
+            "count": count,
+        }
+        for (year, month, txn_type, category, source, currency), (total, count) in deltas.items()
+        if count != 0 or total != 0
+    ]
+    if not rows:
+        return
+    
+    table = MonthlyRollup.__table__
+    stmt = insert(table)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[c.name for c in table.primary_key.columns],
+        set_={
+            "total": table.c.total + stmt.excluded.total,
+            "count": table.c["count"] + stmt.excluded["count"],
+        },
+    )
+    await db.execute(stmt, rows)
+    
+    if any(row["count"] < 0 for row in rows):
+        await db.execute(
+            delete(MonthlyRollup).where(
+                MonthlyRollup.user_id == user_id,
+                MonthlyRollup.count <= 0,
+            )
+        )
+
+
+def _grouped_from_transactions(user_id: Optional[str] = None):
+    year = cast(extract("year", Transaction.date), Integer)
+    month = cast(extract("month", Transaction.date), Integer)
+    # Inline '' - a bound parameter in SELECT and GROUP BY wouldn't match as the same expression
+    source = func.coalesce(Transaction.source, literal_column("''"))
+    query = select(
+        Transaction.user_id,
+        year.label("year"),
+        month.label("month"),
+        Transaction.type,
+        Transaction.category,
+        source.label("source"),
+        Transaction.currency,
+        func.sum(Transaction.amount).label("total"),
+        func.count().label("count"),
+    ).group_by(
+        Transaction.user_id,
+        year,
+        month,
+        Transaction.type,
+        Transaction.category,
+        source,
+        Transaction.currency,
+    )
+    if user_id:
+        query = query.where(Transaction.user_id == user_id)
+    return query
+
+
+async def rebuild_rollups(db: AsyncSession, user_id: Optional[str] = None) -> None:
+    """Recompute rollups from raw transactions (one user, or everyone)."""
+    clear = delete(MonthlyRollup)
+    if user_id:
+        clear = clear.where(MonthlyRollup.user_id == user_id)
+    await db.execute(clear)
+    
+    table = MonthlyRollup.__table__
+    await db.execute(
+        insert(table).from_select(
+            ["user_id", "year", "month", "type", "category", "source", "currency", "total", "count"],
+            _grouped_from_transactions(user_id),
+        )
+    )
+
+
+async def find_rollup_drift(
+    db: AsyncSession, user_id: Optional[str] = None, tolerance: float = 0.005
+) -> List[dict]:
+    """Rollups that disagree with a from-scratch recomputation."""
+    expected = {
+        tuple(row[:7]): (row[7], row[8])
+        for row in (await db.execute(_grouped_from_transactions(user_id))).all()
+    }
+    
+    query = select(MonthlyRollup)
+    if user_id:
+        query = query.where(MonthlyRollup.user_id == user_id)
+    stored = {
+        (r.user_id, r.year, r.month, r.type, r.category, r.source, r.currency): (r.total, r.count)
+        for r in (await db.execute(query)).scalars()
+    }
+    
+    drift = []
+    for key in expected.keys() | stored.keys():
+        want = expected.get(key, (0.0, 0))
+        have = stored.get(key, (0.0, 0))
+        if want[1] != have[1] or abs(want[0] - have[0]) > tolerance:
+            drift.append({"key": key, "expected": want, "stored": have})
+    return drift
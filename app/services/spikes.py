@@ -0,0 +1,138 @@
+# Statistical spending-spike detection over monthly rollups
+import math
+from typing import List, Optional
+
+from sqlalchemy import and_, func, literal_column, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..core.cache import TTLCache
+from ..core.config import get_settings
+from ..models.transaction import MonthlyRollup
+from .ai import get_ai_service
+
+TOTAL = "Total"
+
+_spike_cache: Optional[TTLCache] = None
+
+
+def get_spike_cache() -> TTLCache:
+    """Detection results per user; evicted by every transaction write."""
+    global _spike_cache
+    if _spike_cache is None:
+        settings = get_settings()
+        _spike_cache = TTLCache(maxsize=settings.spike_cache_size, ttl=settings.spike_cache_ttl_seconds)
+    return _spike_cache
+
+
+def invalidate_spikes(user_id: str) -> None:
+    get_spike_cache().pop(user_id)
+
+
+def _year_month(month_index: int) -> tuple:
+    year, month0 = divmod(month_index, 12)
+    return year, month0 + 1
+
+
+async def _baselines(db: AsyncSession, user_id: str, current: int, window: int) -> List:
+    """Per-category (and total) current spend plus sum / sum of squares over the trailing window.
+    
+    One statement: monthly spend per (category, month) and per month via GROUPING SETS,
+    then FILTERed aggregates split current month from history.
+    """
+    # Inline constants: a bound parameter in SELECT and GROUP BY wouldn't match as the same expression
+    month_index = MonthlyRollup.year * literal_column("12") + MonthlyRollup.month - literal_column("1")
+    monthly = (
+        select(
+            MonthlyRollup.category.label("category"),
+            month_index.label("ym"),
+            func.sum(MonthlyRollup.total).label("spent"),
+        )
+        .where(
+            MonthlyRollup.user_id == user_id,
+            MonthlyRollup.type == "expense",
+            MonthlyRollup.category.not_in(["Savings", "Investment"]),
+            # Row-value range keeps the (user_id, year, month, ...) primary key usable
+            tuple_(MonthlyRollup.year, MonthlyRollup.month) >= _year_month(current - window),
+            tuple_(MonthlyRollup.year, MonthlyRollup.month) <= _year_month(current),
+        )
+        .group_by(func.grouping_sets(tuple_(MonthlyRollup.category, month_index), month_index))
+        .subquery()
+    )
+    
+    history = monthly.c.ym < current
+    query = select(
+        func.coalesce(monthly.c.category, TOTAL).label("category"),
+        func.coalesce(func.sum(monthly.c.spent).filter(monthly.c.ym == current), 0.0).label("current"),
+        func.coalesce(func.sum(monthly.c.spent).filter(history), 0.0).label("hist_sum"),
+        func.coalesce(func.sum(monthly.c.spent * monthly.c.spent).filter(history), 0.0).label("hist_sq"),
+        func.count().filter(and_(history, monthly.c.spent > 0)).label("hist_months"),
+    ).group_by(monthly.c.category)
+    
+    return (await db.execute(query)).all()
+
+
+async def detect_spikes(db: AsyncSession, user_id: str, year: int, month: int) -> dict:
+    """Flag categories (and the total) whose spend this month is far above their baseline."""
+    cache = get_spike_cache()
+    cached = cache.get(user_id)
+    if cached is not None and cached["month"] == (year, month):
+        return cached["result"]
+    
+    settings = get_settings()
+    current = year * 12 + month - 1
+    rows = await _baselines(db, user_id, current, settings.spike_window_months)
+    
+    # Months of history the user actually has, so a new user's empty past doesn't count as zeros
+    months = next((r.hist_months for r in rows if r.category == TOTAL), 0)
+    
+    baselines = {}
+    alerts = []
+    for row in rows:
+        if not months:
+            break
+        mean = row.hist_sum / months
+        stddev = math.sqrt(max(row.hist_sq / months - mean * mean, 0.0))
+        baselines[row.category] = {
+            "current": round(row.current, 2),
+            "mean": round(mean, 2),
+            "stddev": round(stddev, 2),
+        }
+        
+        if (
+            months >= settings.spike_min_history_months
+            and mean > 0
+            and row.current > mean + settings.spike_z_threshold * stddev
+            and row.current > mean * settings.spike_min_ratio
+        ):
+            alerts.append({
+                "category": row.category,
+                "current": row.current,
+                "baseline": mean,
+                "increase_pct": (row.current - mean) / mean * 100,
+            })
+    
+    # Total first, then the biggest relative jumps
+    alerts.sort(key=lambda a: (a["category"] != TOTAL, -a["increase_pct"]))
+    
+    warning = None
+    if alerts:
+        warning = await get_ai_service().phrase_spending_alert(alerts)
+        if warning is None:
+            top = alerts[0]
+            warning = (
+                f"{top['category']} spending is {top['increase_pct']:.0f}% above your "
+                f"{months}-month average ({top['current']:.2f} vs {top['baseline']:.2f})."
+            )
+    
+    result = {
+        "warning": warning,
+        "alerts": [
+            {**a, "current": round(a["current"], 2), "baseline": round(a["baseline"], 2),
+             "increase_pct": round(a["increase_pct"], 1)}
+            for a in alerts
+        ],
+        "baselines": baselines,
+        "history_months": months,
+    }
+    cache.set(user_id, {"month": (year, month), "result": result})
+    return result
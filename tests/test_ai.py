@@ -0,0 +1,55 @@
+from unittest.mock import patch
+
+from app.services.ai import CircuitBreaker, parse_numbered_reply
+
+
+def test_parse_numbered_reply_in_order():
+    reply = "2. travel\n1) Food\n3 - Bills"
+    assert parse_numbered_reply(reply, 3) == ["Food", "Travel", "Bills"]
+
+
+def test_parse_numbered_reply_unknown_category_is_other():
+    assert parse_numbered_reply("1. Groceries\n2. Rent", 2) == ["Other", "Rent"]
+
+
+def test_parse_numbered_reply_ignores_chatter():
+    reply = "Here you go:\n1. Food\n2. Shopping\nHope that helps!"
+    assert parse_numbered_reply(reply, 2) == ["Food", "Shopping"]
+
+
+def test_parse_numbered_reply_missing_or_extra_items():
+    assert parse_numbered_reply("1. Food", 2) is None
+    assert parse_numbered_reply("1. Food\n2. Rent\n3. Bills", 2) is None
+    assert parse_numbered_reply("Food\nRent", 2) is None
+
+
+def test_breaker_opens_after_threshold():
+    breaker = CircuitBreaker(threshold=3, reset_after=30)
+    for _ in range(2):
+        breaker.record_failure()
+    assert breaker.state == "closed" and breaker.allow()
+    
+    breaker.record_failure()
+    assert breaker.state == "open"
+    assert not breaker.allow()
+
+
+def test_breaker_success_resets_failures():
+    breaker = CircuitBreaker(threshold=2, reset_after=30)
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    assert breaker.state == "closed"
+
+
+def test_breaker_lets_one_probe_through_after_reset():
+    breaker = CircuitBreaker(threshold=1, reset_after=30)
+    with patch("app.services.ai.time.monotonic", return_value=100.0):
+        breaker.record_failure()
+    
+    with patch("app.services.ai.time.monotonic", return_value=131.0):
+        assert breaker.allow()  # the probe
+        assert not breaker.allow()  # everyone else waits on it
+    
+    breaker.record_success()
+    assert breaker.state == "closed" and breaker.allow()
@@ -0,0 +1,132 @@
+import asyncio
+import time
+
+import pytest
+
+from app.core.cache import SingleFlight, TTLCache
+
+
+def test_ttl_cache_evicts_least_recently_used():
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1  # "b" is now the oldest
+    cache.set("c", 3)
+    
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+
+
+def test_ttl_cache_per_entry_ttl_only_shortens():
+    cache = TTLCache(maxsize=4, ttl=60)
+    cache.set("gone", 1, ttl=0)
+    cache.set("kept", 2, ttl=3600)
+    
+    assert cache.get("gone") is None
+    assert cache.get("kept") == 2
+    expires_at, _ = cache._data["kept"]
+    assert expires_at <= time.monotonic() + 60
+
+
+@pytest.mark.asyncio
+async def test_single_flight_shares_one_call():
+    flight = SingleFlight()
+    calls = 0
+    
+    async def work():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return "result"
+    
+    results = await asyncio.gather(*(flight.do("k", work) for _ in range(5)))
+    
+    assert results == ["result"] * 5
+    assert calls == 1
+    assert flight.stats() == {"in_flight": 0, "calls": 1, "shared": 4}
+
+
+@pytest.mark.asyncio
+async def test_single_flight_propagates_failure_to_every_caller():
+    flight = SingleFlight()
+    
+    async def work():
+        await asyncio.sleep(0.01)
+        raise ValueError("upstream down")
+    
+    results = await asyncio.gather(
+        flight.do("k", work), flight.do("k", work), return_exceptions=True
+    )
+    
+    assert [type(r) for r in results] == [ValueError, ValueError]
+    assert "k" not in flight  # a failure isn't remembered; the next call retries
+
+
+@pytest.mark.asyncio
+async def test_single_flight_caller_cancellation_does_not_cancel_others():
+    flight = SingleFlight()
+    
+    async def work():
+        await asyncio.sleep(0.02)
+        return "result"
+    
+    first = asyncio.create_task(flight.do("k", work))
+    second = asyncio.create_task(flight.do("k", work))
+    await asyncio.sleep(0)
+    first.cancel()
+    
+    assert await second == "result"
+    with pytest.raises(asyncio.CancelledError):
+        await first
+
+
+@pytest.mark.asyncio
+async def test_single_flight_cancelled_work_reaches_every_caller():
+    flight = SingleFlight()
+    started = asyncio.Event()
+    
+    async def work():
+        started.set()
+        await asyncio.sleep(10)
+    
+    callers = [asyncio.create_task(flight.do("k", work)) for _ in range(2)]
+    await started.wait()
+    flight._inflight["k"].cancel()
+    
+    results = await asyncio.gather(*callers, return_exceptions=True)
+    assert all(isinstance(r, asyncio.CancelledError) for r in results)
+    assert "k" not in flight
+
+
+@pytest.mark.asyncio
+async def test_single_flight_abandoned_lead_lets_followers_run_their_own():
+    flight = SingleFlight()
+    leader = flight.lead("k")
+    assert flight.lead("k") is None  # already claimed
+    
+    async def work():
+        return "own"
+    
+    follower = asyncio.create_task(flight.do("k", work))
+    await asyncio.sleep(0)
+    flight.abandon(leader)
+    
+    assert await follower == "own"
+    assert "k" not in flight
+
+
+@pytest.mark.asyncio
+async def test_single_flight_lead_result_reaches_followers():
+    flight = SingleFlight()
+    leader = flight.lead("k")
+    
+    async def work():
+        raise AssertionError("followers must not run their own call")
+    
+    follower = asyncio.create_task(flight.do("k", work))
+    await asyncio.sleep(0)
+    leader.set_result("streamed")
+    flight.abandon(leader)  # no-op once resolved
+    
+    assert await follower == "streamed"
@@ -0,0 +1,50 @@
+from app.services.classifier import (
+    NaiveBayesModel,
+    amount_bucket,
+    features,
+    normalize_remarks,
+    predict,
+)
+
+
+def _train(model, examples):
+    for remarks, amount, category in examples:
+        model.learn(features(normalize_remarks(remarks), amount_bucket(amount)), category)
+    return model
+
+
+def _feats(remarks, amount):
+    return features(normalize_remarks(remarks), amount_bucket(amount))
+
+
+def test_normalize_remarks_drops_digits_and_punctuation():
+    assert normalize_remarks("UBER *Trip 8841") == "uber trip"
+
+
+def test_predict_known_merchant():
+    model = _train(NaiveBayesModel(), [
+        ("Uber trip", 15, "Travel"),
+        ("Uber ride home", 22, "Travel"),
+        ("Starbucks coffee", 5, "Food"),
+        ("Domino's pizza", 18, "Food"),
+    ])
+    category, confidence = predict(_feats("UBER trip 9912", 17), model, None, user_weight=5.0)
+    assert category == "Travel"
+    assert 0.5 < confidence <= 1.0
+
+
+def test_predict_unknown_merchant_abstains():
+    model = _train(NaiveBayesModel(), [("Uber trip", 15, "Travel")])
+    assert predict(_feats("Zzyzx gallery", 40), model, None, user_weight=5.0) == (None, 0.0)
+
+
+def test_predict_empty_model_abstains():
+    assert predict(_feats("Uber trip", 15), NaiveBayesModel(), None, user_weight=5.0) == (None, 0.0)
+
+
+def test_user_labels_outweigh_global_counts():
+    global_model = _train(NaiveBayesModel(), [("Amazon order", 30, "Shopping")] * 3)
+    user_model = _train(NaiveBayesModel(), [("Amazon order", 30, "Bills")])
+    
+    assert predict(_feats("Amazon order", 30), global_model, None, user_weight=5.0)[0] == "Shopping"
+    assert predict(_feats("Amazon order", 30), global_model, user_model, user_weight=5.0)[0] == "Bills"
@@ -0,0 +1,27 @@
+from starlette.requests import Request
+
+from app.core.etag import is_not_modified, make_etag
+
+
+def _request(if_none_match=None):
+    headers = [(b"if-none-match", if_none_match.encode())] if if_none_match else []
+    return Request({"type": "http", "method": "GET", "headers": headers})
+
+
+def test_etag_is_weak_and_stable():
+    etag = make_etag("dashboard", "u1", 3, 2026, 3)
+    assert etag.startswith('W/"')
+    assert etag == make_etag("dashboard", "u1", 3, 2026, 3)
+    assert etag != make_etag("dashboard", "u1", 4, 2026, 3)
+
+
+def test_not_modified_matching():
+    etag = make_etag("transactions", "u1", 1)
+    strong = etag.removeprefix("W/")
+    
+    assert not is_not_modified(_request(), etag)
+    assert is_not_modified(_request(etag), etag)
+    assert is_not_modified(_request(strong), etag)  # weak comparison
+    assert is_not_modified(_request(f'"other", {etag}'), etag)
+    assert is_not_modified(_request("*"), etag)
+    assert not is_not_modified(_request('W/"other"'), etag)
@@ -0,0 +1,94 @@
+from datetime import date
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from app.services.rollups import (
+    add_delta,
+    apply_rollup_deltas,
+    new_deltas,
+    rollup_key,
+    rollup_key_from_row,
+)
+
+
+class RecordingSession:
+    """Stands in for AsyncSession: records each statement and its parameters."""
+
+    def __init__(self):
+        self.calls = []
+
+    async def execute(self, stmt, params=None):
+        self.calls.append((stmt, params))
+
+
+def _txn(**overrides):
+    txn = {
+        "date": date(2026, 3, 14),
+        "type": "expense",
+        "category": "Food",
+        "source": "budget",
+        "currency": "EUR",
+    }
+    txn.update(overrides)
+    return SimpleNamespace(**txn)
+
+
+def test_rollup_key_defaults_type_and_source():
+    key = rollup_key(_txn(type=None, source=None))
+    assert key == (2026, 3, "expense", "Food", "", "EUR")
+    assert rollup_key_from_row(vars(_txn(type=None, source=None))) == key
+
+
+def test_deltas_merge_per_key():
+    deltas = new_deltas()
+    add_delta(deltas, rollup_key(_txn()), 10.0, +1)
+    add_delta(deltas, rollup_key(_txn()), 5.0, +1)
+    add_delta(deltas, rollup_key(_txn(category="Rent")), 700.0, +1)
+    
+    assert deltas[rollup_key(_txn())] == [15.0, 2]
+    assert deltas[rollup_key(_txn(category="Rent"))] == [700.0, 1]
+
+
+@pytest.mark.asyncio
+async def test_move_within_a_key_nets_out_to_nothing():
+    deltas = new_deltas()
+    key = rollup_key(_txn())
+    add_delta(deltas, key, 10.0, -1)
+    add_delta(deltas, key, 10.0, +1)
+    
+    db = RecordingSession()
+    await apply_rollup_deltas(db, "u1", deltas)
+    assert db.calls == []
+
+
+@pytest.mark.asyncio
+async def test_move_between_months_upserts_both_keys():
+    deltas = new_deltas()
+    add_delta(deltas, rollup_key(_txn()), 10.0, -1)
+    add_delta(deltas, rollup_key(_txn(date=date(2026, 4, 1))), 12.0, +1)
+    
+    db = RecordingSession()
+    await apply_rollup_deltas(db, "u1", deltas)
+    
+    upsert, rows = db.calls[0]
+    sql = str(upsert.compile(dialect=postgresql.dialect()))
+    assert "ON CONFLICT" in sql
+    assert "monthly_rollups.total + excluded.total" in sql
+    assert sorted((r["month"], r["total"], r["count"]) for r in rows) == [(3, -10.0, -1), (4, 12.0, 1)]
+    assert all(r["user_id"] == "u1" for r in rows)
+    
+    # A decrement may empty a rollup, so zero-count rows are cleaned up
+    assert len(db.calls) == 2
+    assert "DELETE FROM monthly_rollups" in str(db.calls[1][0])
+
+
+@pytest.mark.asyncio
+async def test_pure_insert_skips_the_cleanup():
+    deltas = new_deltas()
+    add_delta(deltas, rollup_key(_txn()), 10.0, +1)
+    
+    db = RecordingSession()
+    await apply_rollup_deltas(db, "u1", deltas)
+    assert len(db.calls) == 1
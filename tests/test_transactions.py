@@ -0,0 +1,63 @@
+import base64
+import json
+import string
+from datetime import date, datetime
+from types import SimpleNamespace
+from uuid import uuid4
+
+import pytest
+from fastapi import HTTPException
+
+from app.routers.transactions import decode_cursor, encode_cursor
+
+
+def _row(**overrides):
+    row = {
+        "id": uuid4(),
+        "date": date(2026, 3, 14),
+        "amount": 12.5,
+        "created_at": datetime(2026, 3, 14, 9, 30, 5, 123456),
+    }
+    row.update(overrides)
+    return SimpleNamespace(**row)
+
+
+@pytest.mark.parametrize("sort", ["latest", "oldest"])
+def test_cursor_round_trip_by_date(sort):
+    row = _row()
+    assert decode_cursor(sort, encode_cursor(sort, row)) == (row.date, row.created_at, row.id)
+
+
+@pytest.mark.parametrize("sort", ["amount_asc", "amount_desc"])
+def test_cursor_round_trip_by_amount(sort):
+    row = _row(amount=1999.99)
+    assert decode_cursor(sort, encode_cursor(sort, row)) == (1999.99, row.created_at, row.id)
+
+
+def test_cursor_is_url_safe_without_padding():
+    cursor = encode_cursor("latest", _row())
+    assert set(cursor) <= set(string.ascii_letters + string.digits + "-_")
+
+
+def test_cursor_rejected_for_another_sort():
+    cursor = encode_cursor("latest", _row())
+    with pytest.raises(HTTPException) as exc:
+        decode_cursor("amount_desc", cursor)
+    assert exc.value.status_code == 400
+
+
+@pytest.mark.parametrize(
+    "cursor",
+    [
+        "not-base64!",
+        base64.urlsafe_b64encode(b"not json").decode(),
+        base64.urlsafe_b64encode(json.dumps(["latest", "2026-03-14"]).encode()).decode(),
+        base64.urlsafe_b64encode(
+            json.dumps(["latest", "2026-03-14", "2026-03-14T09:30:05", "not-a-uuid"]).encode()
+        ).decode(),
+    ],
+)
+def test_cursor_garbage_is_400(cursor):
+    with pytest.raises(HTTPException) as exc:
+        decode_cursor("latest", cursor)
+    assert exc.value.status_code == 400